@@ -0,0 +1,83 @@
+"""
+    Wall-clock time of the tutorial photo and video uploads, one after the
+    other with boto3's default transfer settings against the concurrent,
+    tuned uploads of ExerciseManager._run_uploads. Meant for a local S3
+    compatible server, e.g. MinIO or moto_server, with the usual settings:
+
+    AWS_ENDPOINT_URL=http://localhost:9000 AWS_BUCKET=bench python -m benchmarks.s3_uploads
+"""
+import io
+import os
+import time
+from functools import partial
+
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+
+from managers.exercise import ExerciseManager
+from services.s3 import S3Service
+
+PHOTO_SIZE = 512 * 1024
+VIDEO_SIZES_MB = (5, 25, 50, 100)
+REPEAT = 3
+
+s3 = S3Service()
+
+
+def default_service():
+    # What S3Service did before it had its own transfer and pool settings
+    service = S3Service()
+    service.transfer_config = TransferConfig()
+    service.max_pool_connections = 10
+    return service
+
+
+def sequential(service, photo, video):
+    service.upload_photo(io.BytesIO(photo), "bench/photo.jpg", "jpg")
+    service.upload_video(io.BytesIO(video), "bench/video.mp4", "mp4")
+
+
+def concurrent(photo, video):
+    results = ExerciseManager._run_uploads({
+        "bench/photo.jpg": partial(s3.upload_photo, io.BytesIO(photo), "bench/photo.jpg", "jpg"),
+        "bench/video.mp4": partial(s3.upload_video, io.BytesIO(video), "bench/video.mp4", "mp4"),
+    })
+    for result in results.values():
+        if isinstance(result, Exception):
+            raise result
+
+
+def best_of(function, *args):
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    try:
+        s3.s3.create_bucket(
+            Bucket=s3.aws_bucket,
+            CreateBucketConfiguration={"LocationConstraint": s3.aws_region},
+        )
+    except ClientError as ex:
+        if ex.response["Error"]["Code"] not in ("BucketAlreadyOwnedByYou", "BucketAlreadyExists"):
+            raise
+
+    baseline = default_service()
+    photo = os.urandom(PHOTO_SIZE)
+    config = s3.transfer_config
+    print(
+        f"threshold {config.multipart_threshold >> 20} MB, chunks {config.multipart_chunksize >> 20} MB, "
+        f"concurrency {config.max_concurrency}, pool {s3.max_pool_connections}, best of {REPEAT}"
+    )
+    for size in VIDEO_SIZES_MB:
+        video = os.urandom(size * 1024 * 1024)
+        before = best_of(sequential, baseline, photo, video)
+        after = best_of(concurrent, photo, video)
+        print(
+            f"{size:>4} MB video   sequential {before * 1000:8.1f} ms"
+            f"   concurrent {after * 1000:8.1f} ms   x{before / after:.2f}"
+        )
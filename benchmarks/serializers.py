@@ -0,0 +1,56 @@
+"""
+    Compares Schema().dump() with the compiled serializers on 10k rows.
+    Run from the project root: python -m benchmarks.serializers
+"""
+import timeit
+from types import SimpleNamespace
+
+from schemas.response.exercise import (
+    ExerciseUserResponseSchema,
+    ExerciseSuperUserResponseSchema,
+    exercise_user_serializer,
+    exercise_super_user_serializer,
+)
+from schemas.response.program import ProgramResponseSchema, program_serializer
+
+ROWS = 10_000
+REPEAT = 5
+
+
+def exercises(count):
+    return [
+        SimpleNamespace(
+            pk=pk,
+            name=f"Exercise {pk}",
+            description="A compound lift for the whole posterior chain",
+            photo_tutorial=f"https://bucket.s3.eu-central-1.amazonaws.com/{pk}.jpg",
+            video=f"https://bucket.s3.eu-central-1.amazonaws.com/{pk}.mp4",
+        )
+        for pk in range(1, count + 1)
+    ]
+
+
+def programs(count):
+    pool = exercises(50)
+    return [
+        SimpleNamespace(pk=pk, title=f"Program {pk}", exercises=pool[pk % 40:pk % 40 + 8])
+        for pk in range(1, count + 1)
+    ]
+
+
+def measure(name, schema, serializer, rows):
+    assert schema().dump(rows, many=True) == serializer.dump(rows, many=True)
+    marshmallow = min(timeit.repeat(lambda: schema().dump(rows, many=True), number=1, repeat=REPEAT))
+    compiled = min(timeit.repeat(lambda: serializer.dump(rows, many=True), number=1, repeat=REPEAT))
+    print(
+        f"{name:<32} marshmallow {marshmallow * 1000:8.1f} ms"
+        f"   compiled {compiled * 1000:8.1f} ms   x{marshmallow / compiled:.1f}"
+    )
+
+
+if __name__ == "__main__":
+    print(f"{ROWS} rows, best of {REPEAT}")
+    measure("ExerciseUserResponseSchema", ExerciseUserResponseSchema, exercise_user_serializer, exercises(ROWS))
+    measure("ExerciseSuperUserResponseSchema", ExerciseSuperUserResponseSchema,
+            exercise_super_user_serializer, exercises(ROWS))
+    measure("ProgramResponseSchema", ProgramResponseSchema, program_serializer, programs(ROWS))
@@ -0,0 +1,76 @@
+"""
+    The steps every upload path goes through, timed against the storage
+    picked by STORAGE_BACKEND. With the local backend nothing leaves the
+    machine, so it runs offline:
+
+    STORAGE_BACKEND=local LOCAL_STORAGE_FOLDER=/tmp/media python -m benchmarks.uploads
+"""
+import base64
+import io
+import os
+import time
+from functools import partial
+
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+from managers.exercise import ExerciseManager
+from managers.media import storage
+from utils.healpers import decode_photo, decode_video, open_media
+from utils.images import start_variants, variants_result
+
+PHOTO_SIDE = 3000
+VIDEO_SIZES_MB = (5, 25, 100)
+REPEAT = 3
+
+
+def best_of(function, *args):
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def open_base64(encoded, decode):
+    with open_media(encoded, decode) as (stream, digest):
+        return digest
+
+
+def open_multipart(data):
+    with open_media(FileStorage(io.BytesIO(data), "video.mp4"), decode_video) as (stream, digest):
+        return digest
+
+
+def resize(photo):
+    return variants_result(start_variants(io.BytesIO(photo)))
+
+
+def store(photo, video):
+    results = ExerciseManager._run_uploads({
+        "bench/photo.png": partial(storage.upload_photo, io.BytesIO(photo), "bench/photo.png", "png"),
+        "bench/video.mp4": partial(storage.upload_video, io.BytesIO(video), "bench/video.mp4", "mp4"),
+    })
+    for result in results.values():
+        if isinstance(result, Exception):
+            raise result
+
+
+if __name__ == "__main__":
+    buffer = io.BytesIO()
+    Image.effect_noise((PHOTO_SIDE, PHOTO_SIDE), 64).convert("RGB").save(buffer, "PNG")
+    photo = buffer.getvalue()
+    print(f"{type(storage.backend).__name__}, {len(photo) >> 20} MB {PHOTO_SIDE}px photo, best of {REPEAT}")
+
+    resize(photo)  # Starts the image pool
+    print(f"{'photo variants':<28} {best_of(resize, photo):9.1f} ms")
+    print(f"{'photo base64 decode':<28} {best_of(open_base64, base64.b64encode(photo).decode(), decode_photo):9.1f} ms")
+
+    for size in VIDEO_SIZES_MB:
+        video = os.urandom(size * 1024 * 1024)
+        encoded = base64.b64encode(video).decode()
+        print(f"{size:>4} MB video")
+        print(f"{'  base64 decode + hash':<28} {best_of(open_base64, encoded, decode_video):9.1f} ms")
+        print(f"{'  multipart hash':<28} {best_of(open_multipart, video):9.1f} ms")
+        print(f"{'  store photo and video':<28} {best_of(store, photo, video):9.1f} ms")
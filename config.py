@@ -5,7 +5,9 @@ from flask_migrate import Migrate
 from flask_restful import Api
 
 from db import db
+from managers.exercise import start_media_workers
 from resources.routes import routes
+from utils.temp_files import SpooledRequest, start_janitor
 
 
 class DevelopmentConfig:
@@ -37,11 +39,14 @@ class TestingConfig:
         f"postgresql://{config('DB_USER')}:{config('DB_PASSWORD')}@"
         f"localhost:{config('DB_PORT')}/{config('TEST_DB_NAME')}"
     )
+    # Media is uploaded within the request, nothing is left running after a test
+    MEDIA_UPLOADS_INLINE = True
 
 
 def create_app(environment):
     app = Flask(__name__)
     app.config.from_object(environment)
+    app.request_class = SpooledRequest
     db.init_app(app)
     migrate = Migrate(app, db)
 
@@ -50,5 +55,9 @@ def create_app(environment):
 
     [api.add_resource(*route) for route in routes]
 
+    start_janitor()
+    if not app.config.get("MEDIA_UPLOADS_INLINE"):
+        start_media_workers(app)
+
     # Adding .run so the app can work via container
     return app.run(host="0.0.0.0", port=5000)
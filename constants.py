@@ -2,3 +2,5 @@ import os
 
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 TEMP_FILE_FOLDER = os.path.join(ROOT_DIR, "temp_files")
+# Payloads of queued media uploads, kept until the upload job is done
+MEDIA_QUEUE_FOLDER = os.path.join(ROOT_DIR, "media_queue")
@@ -1,35 +1,251 @@
+import hashlib
+import uuid
 from datetime import datetime, timedelta, timezone
 
 import jwt
 from decouple import config
 from flask_httpauth import HTTPTokenAuth
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import make_transient_to_detached
 from werkzeug.exceptions import Unauthorized
 
 from db import db
-from models import UserModel
+from models import UserModel, RoleType, RevokedTokenModel
+from utils.bloom import BloomFilter
+from utils.cache import Refreshed, TTLCache, register_cache
+from utils.rate_limit import RateLimiter
+
+"""
+    Verified tokens are cached by their digest, together with the
+    decoded claims and a detached snapshot of the user, so the common
+    path skips both the signature check and the user query
+"""
+
+ACCESS_TOKEN_LIFETIME = timedelta(minutes=config("ACCESS_TOKEN_MINUTES", default=15, cast=int))
+REFRESH_TOKEN_LIFETIME = timedelta(days=config("REFRESH_TOKEN_DAYS", default=5, cast=int))
+# Tokens issued before refresh tokens have no type and lived this long, verify_token still accepts them
+LEGACY_TOKEN_LIFETIME = timedelta(days=5)
+
+# "database" loads the user row per request, "claims" trusts the role in the token
+AUTH_MODE = config("AUTH_MODE", default="database")
+
+token_cache = TTLCache(
+    maxsize=config("TOKEN_CACHE_SIZE", default=1024, cast=int),
+    ttl=config("TOKEN_CACHE_TTL", default=300, cast=int),
+)
+
+# Login attempts are limited per email and per client before any hashing
+LOGIN_WINDOW_SECONDS = config("LOGIN_WINDOW_SECONDS", default=300, cast=int)
+
+email_login_limiter = RateLimiter(
+    capacity=config("LOGIN_ATTEMPTS_PER_EMAIL", default=5, cast=int),
+    period=LOGIN_WINDOW_SECONDS,
+)
+client_login_limiter = RateLimiter(
+    capacity=config("LOGIN_ATTEMPTS_PER_CLIENT", default=20, cast=int),
+    period=LOGIN_WINDOW_SECONDS,
+)
+
+
+class RevocationList:
+    """
+        Bloom filter of revoked token ids and of users whose older access
+        tokens were revoked. It's rebuilt from revoked_tokens every few
+        seconds, and only the rare "maybe revoked" answers hit the database
+    """
+
+    def __init__(self, capacity, refresh_seconds):
+        self.capacity = capacity
+        self.refresh_seconds = refresh_seconds
+        self.checks = 0
+        self.confirmations = 0
+        self._filter = Refreshed(self._build, refresh_seconds)
+        register_cache(self)
+
+    def _build(self):
+        now = datetime.now(timezone.utc)
+        # Every token these rows stop has expired by itself, so the table stays small
+        db.session.execute(
+            db.delete(RevokedTokenModel).where(RevokedTokenModel.expires_at <= now)
+        )
+        rows = db.session.execute(
+            db.select(RevokedTokenModel.jti, RevokedTokenModel.user_pk).where(
+                RevokedTokenModel.expires_at > now
+            )
+        ).all()
+
+        bloom = BloomFilter(max(self.capacity, 2 * len(rows)))
+        for jti, user_pk in rows:
+            bloom.add(f"jti:{jti}" if jti is not None else f"user:{user_pk}")
+        return bloom
+
+    def is_revoked(self, claims):
+        bloom = self._filter.get()
+        self.checks += 1
+        jti, user_pk = claims.get("jti"), claims["sub"]
+        if f"jti:{jti}" not in bloom and f"user:{user_pk}" not in bloom:
+            return False
+
+        self.confirmations += 1
+        issued_at = datetime.fromtimestamp(claims.get("iat", 0), timezone.utc)
+        conditions = [
+            db.and_(
+                RevokedTokenModel.user_pk == user_pk,
+                RevokedTokenModel.revoked_at >= issued_at
+            )
+        ]
+        if jti is not None:
+            conditions.append(RevokedTokenModel.jti == jti)
+
+        return db.session.execute(
+            db.select(RevokedTokenModel.pk).where(
+                db.or_(*conditions),
+                RevokedTokenModel.expires_at > datetime.now(timezone.utc)
+            ).limit(1)
+        ).scalar() is not None
+
+    def revoke(self, revoked_token: RevokedTokenModel):
+        db.session.add(revoked_token)
+        db.session.flush()
+
+        if revoked_token.jti is not None:
+            self._filter.update(lambda bloom: bloom.add(f"jti:{revoked_token.jti}"))
+        else:
+            self._filter.update(lambda bloom: bloom.add(f"user:{revoked_token.user_pk}"))
+
+    def clear(self):
+        self._filter.reset()
+        self.checks = 0
+        self.confirmations = 0
+
+    def stats(self):
+        bloom = self._filter.value
+        return {
+            "size": len(bloom) if bloom is not None else 0,
+            "checks": self.checks,
+            "confirmations": self.confirmations,
+            "refresh_seconds": self.refresh_seconds,
+        }
+
+
+revocations = RevocationList(
+    capacity=config("REVOCATION_FILTER_CAPACITY", default=10_000, cast=int),
+    refresh_seconds=config("REVOCATION_REFRESH_SECONDS", default=30, cast=int),
+)
 
 
 class AuthManager:
     @staticmethod
-    def encode_token(user: UserModel):
+    def _encode(user, token_type, lifetime):
+        now = datetime.now(timezone.utc)
         data = {
             "sub": user.pk,
-            "exp": datetime.now(timezone.utc) + timedelta(days=5),
-            "role": user.role if isinstance(user.role, str) else user.role.name
+            "iat": now.timestamp(),
+            "exp": now + lifetime,
+            "jti": uuid.uuid4().hex,
+            "type": token_type,
         }
+        if token_type == "access":
+            data["role"] = user.role if isinstance(user.role, str) else user.role.name
         key = config("SECRET_KEY")
-        new_token = jwt.encode(data, key=key, algorithm="HS256")
-        return {"token": new_token}
+        return jwt.encode(data, key=key, algorithm="HS256")
 
     @staticmethod
-    def decode_token(token):
+    def encode_token(user: UserModel):
+        return {
+            "token": AuthManager._encode(user, "access", ACCESS_TOKEN_LIFETIME),
+            "refresh_token": AuthManager._encode(user, "refresh", REFRESH_TOKEN_LIFETIME),
+        }
+
+    @staticmethod
+    def decode_claims(token):
         try:
             key = config("SECRET_KEY")
-            user = jwt.decode(token, key=key, algorithms=["HS256"])
+            claims = jwt.decode(token, key=key, algorithms=["HS256"])
         except:
             raise jwt.exceptions.InvalidTokenError
         else:
-            return user["sub"], user["role"]
+            return claims
+
+    @staticmethod
+    def decode_token(token):
+        claims = AuthManager.decode_claims(token)
+        return claims["sub"], claims["role"]
+
+    @staticmethod
+    def refresh_token(refresh_token):
+        try:
+            claims = AuthManager.decode_claims(refresh_token)
+        except jwt.exceptions.InvalidTokenError:
+            raise Unauthorized("Invalid or expired refresh token")
+        if claims.get("type") != "refresh":
+            raise Unauthorized("Invalid or expired refresh token")
+
+        # Refresh tokens are single use, the unique jti rejects a second rotation
+        try:
+            revocations.revoke(RevokedTokenModel(
+                jti=claims["jti"],
+                revoked_at=datetime.now(timezone.utc),
+                expires_at=datetime.fromtimestamp(claims["exp"], timezone.utc),
+            ))
+        except IntegrityError:
+            raise Unauthorized("Refresh token was already used")
+
+        # The role is read again here, so role changes reach the new access token
+        user = db.session.get(UserModel, claims["sub"])
+        if user is None:
+            raise Unauthorized("Invalid or expired refresh token")
+        return AuthManager.encode_token(user)
+
+    @staticmethod
+    def revoke_user_tokens(user_pk):
+        # Called after role changes, every access token issued so far stops working
+        now = datetime.now(timezone.utc)
+        revocations.revoke(RevokedTokenModel(
+            user_pk=user_pk,
+            revoked_at=now,
+            # Kept until the longest lived token verify_token accepts has expired
+            expires_at=now + max(ACCESS_TOKEN_LIFETIME, LEGACY_TOKEN_LIFETIME),
+        ))
+        token_cache.discard_where(lambda entry: entry[0]["sub"] == user_pk)
+
+
+class Principal:
+    """
+        The authenticated user as described by the token claims.
+        The ORM user is loaded only when something other than
+        the pk or the role is needed, e.g. user.programs
+    """
+
+    def __init__(self, pk, role: RoleType):
+        self.pk = pk
+        self.role = role
+        self._user = None
+
+    @classmethod
+    def from_claims(cls, claims):
+        return cls(claims["sub"], RoleType[claims["role"]])
+
+    @property
+    def user(self) -> UserModel:
+        if self._user is None:
+            self._user = db.session.get(UserModel, self.pk)
+        return self._user
+
+    def __getattr__(self, name):
+        return getattr(self.user, name)
+
+
+def user_snapshot(user: UserModel):
+    # The password hash is left out on purpose, it's lazy loaded if ever needed
+    columns = {
+        column.key: getattr(user, column.key)
+        for column in UserModel.__mapper__.column_attrs
+        if column.key != "password"
+    }
+    snapshot = UserModel(**columns)
+    make_transient_to_detached(snapshot)
+    return snapshot
 
 
 auth = HTTPTokenAuth(scheme="Bearer")
@@ -37,10 +253,32 @@ auth = HTTPTokenAuth(scheme="Bearer")
 
 @auth.verify_token
 def verify_token(token):
-    try:
-        user_pk, user_role = AuthManager.decode_token(token)
-        user = db.session.execute(db.select(UserModel).filter_by(pk=user_pk)).scalar()
-    except jwt.exceptions.InvalidTokenError:
-        raise Unauthorized("Invalid or missing token")
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+    cached = token_cache.get(digest)
+    if cached is not None:
+        claims, snapshot = cached
     else:
-        return user
+        try:
+            claims = AuthManager.decode_claims(token)
+        except jwt.exceptions.InvalidTokenError:
+            raise Unauthorized("Invalid or missing token")
+        # Tokens issued before refresh tokens existed have no type
+        if claims.get("type", "access") != "access":
+            raise Unauthorized("Invalid or missing token")
+        snapshot = None
+
+    if revocations.is_revoked(claims):
+        raise Unauthorized("Invalid or missing token")
+
+    if AUTH_MODE == "claims":
+        if cached is None:
+            token_cache.set(digest, (claims, None), expires_at=claims["exp"])
+        return Principal.from_claims(claims)
+
+    if snapshot is not None:
+        return db.session.merge(snapshot, load=False)
+
+    user = db.session.execute(db.select(UserModel).filter_by(pk=claims["sub"])).scalar()
+    if user is not None:
+        token_cache.set(digest, (claims, user_snapshot(user)), expires_at=claims["exp"])
+    return user
@@ -1,43 +1,361 @@
+import io
 import os
+import threading
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime, timedelta, timezone
+from functools import partial
 
+from decouple import config
+from flask import current_app
 from flask_restful import Resource
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
-from werkzeug.exceptions import NotFound, Conflict
+from werkzeug.exceptions import BadRequest, NotFound, Conflict, HTTPException
 
-from constants import TEMP_FILE_FOLDER
+from constants import MEDIA_QUEUE_FOLDER
 from db import db
+from managers.media import MediaObjectManager, media_key, media_workers, storage
+from managers.version import VersionManager
+from models.enums import JobStatus, MediaStatus, MediaType
 from models.exercise import ExerciseModel
-from services.s3 import S3Service
-from utils.healpers import decode_photo, decode_video
+from models.media_job import MediaJobModel
+from schemas.request.exercise import CreateExerciseRequest
+from schemas.response.exercise import ExerciseSuperUserResponseSchema, exercise_super_user_serializer
+from utils.background import on_commit
+from utils.cache import Refreshed, SnapshotCache, register_cache
+from utils.healpers import decode_photo, decode_video, open_media, schema_columns, write_media
+from utils.images import IMAGE_VARIANTS, VARIANT_EXTENSION, start_variants, variant_key, variants_result
+from utils.prefix_index import PrefixIndex
 
-s3 = S3Service()
+EXERCISE_UPLOAD_WORKERS = config("EXERCISE_UPLOAD_WORKERS", default=4, cast=int)
+MEDIA_JOB_MAX_ATTEMPTS = config("MEDIA_JOB_MAX_ATTEMPTS", default=3, cast=int)
+# Failed attempts, and jobs whose worker went away, are picked up again this often
+MEDIA_JOB_RETRY_SECONDS = config("MEDIA_JOB_RETRY_SECONDS", default=60, cast=int)
+# A running job not finished by then is taken to be lost with its worker
+MEDIA_JOB_TIMEOUT = config("MEDIA_JOB_TIMEOUT", default=600, cast=int)
+# Broad search terms rank at most this many matches
+SEARCH_CANDIDATE_LIMIT = config("SEARCH_CANDIDATE_LIMIT", default=1000, cast=int)
+
+# Exercise columns with the photo's resized copies
+VARIANT_COLUMNS = [f"photo_{name}" for name in IMAGE_VARIANTS]
+
+_media_sweeper = None
+_media_sweeper_lock = threading.Lock()
+
+# Encoded /exercise responses, see AllExercisesList
+exercise_snapshots = SnapshotCache(
+    maxsize=config("EXERCISE_SNAPSHOT_CACHE_SIZE", default=256, cast=int)
+)
+
+
+class ExerciseNameIndex:
+    """
+        Exercise names for autocomplete, loaded on first use. Committed
+        creates and deletes of this worker update it right away, and it's
+        reloaded every few seconds to pick up changes made by the other workers
+    """
+
+    def __init__(self, refresh_seconds):
+        self.refresh_seconds = refresh_seconds
+        self.lookups = 0
+        self._index = Refreshed(self._build, refresh_seconds)
+        register_cache(self)
+
+    @staticmethod
+    def _build():
+        rows = db.session.execute(
+            db.select(ExerciseModel.pk, ExerciseModel.name).execution_options(yield_per=1000)
+        )
+        return PrefixIndex(rows)
+
+    def add(self, entries):
+        # (pk, name) pairs, a whole batch at once
+        self._index.update(lambda index: index.add(entries))
+
+    def remove(self, pk, name):
+        self._index.update(lambda index: index.remove(pk, name))
+
+    def suggest(self, prefix, limit):
+        index = self._index.get()
+        self.lookups += 1
+        return index.search(prefix, limit)
+
+    def clear(self):
+        self._index.reset()
+        self.lookups = 0
+
+    def stats(self):
+        index = self._index.value
+        return {
+            "size": len(index) if index is not None else 0,
+            "lookups": self.lookups,
+            "refresh_seconds": self.refresh_seconds,
+        }
+
+
+exercise_names = ExerciseNameIndex(
+    refresh_seconds=config("EXERCISE_SUGGEST_REFRESH_SECONDS", default=60, cast=int)
+)
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _resume_media_jobs_forever(interval):
+    while True:
+        media_workers.submit(ExerciseManager.resume_media_jobs)
+        media_workers.submit(ExerciseManager.sweep_media_queue)
+        time.sleep(interval)
+
+
+def start_media_workers(app, interval=MEDIA_JOB_RETRY_SECONDS):
+    # Also resumes the jobs left behind by earlier processes, right away and every interval seconds
+    global _media_sweeper
+    with _media_sweeper_lock:
+        media_workers.start(app)
+        if _media_sweeper is not None and _media_sweeper[0] == os.getpid():
+            return
+        os.makedirs(MEDIA_QUEUE_FOLDER, exist_ok=True)
+        thread = threading.Thread(target=_resume_media_jobs_forever, args=(interval,), daemon=True)
+        thread.start()
+        _media_sweeper = (os.getpid(), thread)
 
 
 class ExerciseManager(Resource):
     @staticmethod
-    def create_exercise(exercise_data):
-        tutorial_photo = exercise_data.pop("tutorial_photo")
-        tutorial_extension = exercise_data.pop("tutorial_extension")
+    def _open_media(exercise_data, stack):
+        """
+            Pops the photo and video out of exercise_data and opens them
+            on stack. Returns (column, key, extension, stream, upload)
+            tuples, keyed by content so equal files share one object
+        """
+        files = []
+        for field, extension_field, column, decode, upload in (
+            ("tutorial_photo", "tutorial_extension", "photo_tutorial", decode_photo, storage.upload_photo),
+            ("video_example", "video_extension", "video", decode_video, storage.upload_video),
+        ):
+            media = exercise_data.pop(field)
+            extension = exercise_data.pop(extension_field)
+            if not (media and extension):
+                continue
+            stream, digest = stack.enter_context(open_media(media, decode))
+            files.append((column, media_key(digest, extension), extension, stream, upload))
+        return files
 
-        tutorial_key = f"{uuid.uuid4()}.{tutorial_extension}"
-        full_tutorial_path = os.path.join(TEMP_FILE_FOLDER, tutorial_key)
-        decode_photo(full_tutorial_path, tutorial_photo)
+    @staticmethod
+    def _run_uploads(uploads):
+        """
+            Runs the {key: upload} calls, the first one on this thread and
+            the rest side by side with it. Returns {key: url or exception}
+        """
+        results = {}
+        if not uploads:
+            return results
+        (first_key, first), *rest = uploads.items()
+        with ThreadPoolExecutor(max_workers=EXERCISE_UPLOAD_WORKERS) as executor:
+            futures = {key: executor.submit(upload) for key, upload in rest}
+            try:
+                results[first_key] = first()
+            except HTTPException as ex:
+                results[first_key] = ex
+            for key, future in futures.items():
+                try:
+                    results[key] = future.result()
+                except HTTPException as ex:
+                    results[key] = ex
+        return results
 
-        tutorial_url = s3.upload_photo(
-            full_tutorial_path, tutorial_key, tutorial_extension
-        )
-        exercise_data["photo_tutorial"] = tutorial_url
+    @staticmethod
+    def _store_new_media(files):
+        """
+            Uploads {key: (column, stream, extension, upload)} files that
+            aren't stored yet, while the photos are resized on the image
+            pool, then the photos' variants. Returns {key: (url, variants)},
+            or the exception for a file that didn't upload. Nothing is
+            counted yet, see MediaObjectManager.acquire
+        """
+        resizing = {
+            key: start_variants(stream)
+            for key, (column, stream, extension, upload) in files.items()
+            if column == "photo_tutorial"
+        }
+        results = ExerciseManager._run_uploads({
+            key: partial(upload, stream, key, extension)
+            for key, (column, stream, extension, upload) in files.items()
+        })
+
+        variant_uploads = {}
+        for key, future in resizing.items():
+            variants = variants_result(future)
+            if isinstance(results[key], HTTPException):
+                continue
+            for name, data in variants.items():
+                name_key = variant_key(key, name)
+                variant_uploads[name_key] = partial(
+                    storage.upload_photo, io.BytesIO(data), name_key, VARIANT_EXTENSION
+                )
+        variant_urls = ExerciseManager._run_uploads(variant_uploads)
+
+        stored = {}
+        for key, url in results.items():
+            if isinstance(url, HTTPException):
+                stored[key] = url
+                continue
+            # A missing variant only means clients fall back to the photo itself
+            variants = {}
+            for name in IMAGE_VARIANTS:
+                variant_url = variant_urls.get(variant_key(key, name))
+                if variant_url is not None and not isinstance(variant_url, HTTPException):
+                    variants[name] = variant_url
+            stored[key] = (url, variants or None)
+        return stored
+
+    @staticmethod
+    def _restore_media(files, keys):
+        """
+            Stores the looked up files of keys again, their rows had no
+            references left and the files may be deleted already, see
+            MediaObjectManager.acquire
+        """
+        files = {key: files[key] for key in keys if key in files}
+        if not files:
+            return
+        for _, stream, *_ in files.values():
+            stream.seek(0)
+        for stored in ExerciseManager._store_new_media(files).values():
+            if isinstance(stored, HTTPException):
+                raise stored
+
+    @staticmethod
+    def _media_columns(column, url, variants):
+        columns = {column: url}
+        if column == "photo_tutorial":
+            variants = variants or {}
+            columns.update({f"photo_{name}": variants.get(name) for name in IMAGE_VARIANTS})
+        return columns
+
+    @staticmethod
+    def _upload_media(exercise_data):
+        with ExitStack() as stack:
+            opened = ExerciseManager._open_media(exercise_data, stack)
+            # Files of earlier exercises aren't uploaded again
+            existing = MediaObjectManager.lookup([key for _, key, *_ in opened])
+            files, looked_up = {}, {}
+            for column, key, extension, stream, upload in opened:
+                media = looked_up if key in existing else files
+                media.setdefault(key, (column, stream, extension, upload))
+            stored = {**ExerciseManager._store_new_media(files), **existing}
+
+            for _, key, *_ in opened:
+                if isinstance(stored[key], HTTPException):
+                    raise stored[key]
+            # Counted only once every file is stored, so the row locks never wait on an upload
+            acquired = MediaObjectManager.acquire(
+                [(key, *stored[key]) for _, key, *_ in opened],
+                restore=partial(ExerciseManager._restore_media, looked_up)
+            )
+        for column, key, *_ in opened:
+            exercise_data.update(ExerciseManager._media_columns(column, *acquired[key]))
+        return exercise_data
+
+    @staticmethod
+    def prepare_uploads(upload_data):
+        uploads = {}
+        for field, extension_field, media_type in (
+            ("tutorial_photo", "tutorial_extension", "image"),
+            ("video_example", "video_extension", "video"),
+        ):
+            extension = upload_data[extension_field]
+            if extension is None:
+                continue
+            extension = extension.lower()
+            key = f"uploads/{uuid.uuid4().hex}.{extension}"
+            content_type = f"{media_type}/{extension}"
+            uploads[field] = {
+                "key": key,
+                "url": storage.presigned_upload(key, content_type),
+                "content_type": content_type,
+            }
+        return uploads
+
+    @staticmethod
+    def _attach_stored_media(exercise_data):
+        # The client uploaded the files with presigned URLs, only check that they are there
+        stored = []
+        for key_field, column, message in (
+            ("tutorial_key", "photo_tutorial", "Tutorial photo was not uploaded"),
+            ("video_key", "video", "Video example was not uploaded"),
+        ):
+            key = exercise_data.pop(key_field)
+            if key is None:
+                continue
+            if not storage.object_exists(key):
+                raise BadRequest(message)
+            stored.append((column, key, storage.object_url(key)))
+
+        # Counted like uploaded media, so deleting the exercise frees them
+        acquired = MediaObjectManager.acquire([(key, url, None) for _, key, url in stored])
+        for column, key, _ in stored:
+            exercise_data.update(ExerciseManager._media_columns(column, *acquired[key]))
+        return exercise_data
+
+    @staticmethod
+    def _stage_media(exercise_data):
+        """
+            Writes the photo and video to MEDIA_QUEUE_FOLDER and returns
+            their upload jobs, the files are removed again on rollback
+            or when one of them can't be decoded
+        """
+        jobs = []
+        staged_paths = []
+        for field, extension_field, media_type, decode in (
+            ("tutorial_photo", "tutorial_extension", MediaType.photo, decode_photo),
+            ("video_example", "video_extension", MediaType.video, decode_video),
+        ):
+            media = exercise_data.pop(field)
+            extension = exercise_data.pop(extension_field)
+            if not (media and extension):
+                continue
 
-        video_example = exercise_data.pop("video_example")
-        video_extension = exercise_data.pop("video_extension")
-        if video_example and video_extension:
-            video_key = f"{uuid.uuid4()}.{video_extension}"
-            full_video_path = os.path.join(TEMP_FILE_FOLDER, video_key)
-            decode_video(full_video_path, video_example)
-            video_url = s3.upload_video(full_video_path, video_key, video_extension)
-            exercise_data["video"] = video_url
+            key = f"{uuid.uuid4()}.{extension}"
+            path = os.path.join(MEDIA_QUEUE_FOLDER, key)
+            media_workers.on_rollback(_remove_file, path)
+            staged_paths.append(path)
+            os.makedirs(MEDIA_QUEUE_FOLDER, exist_ok=True)
+            try:
+                with open(path, "wb") as staged:
+                    digest = write_media(staged, media, decode)
+            except Exception:
+                # The error response may still commit, which drops the rollback hooks
+                for staged_path in staged_paths:
+                    _remove_file(staged_path)
+                raise
+            jobs.append(MediaJobModel(
+                media_type=media_type,
+                key=key,
+                extension=extension,
+                digest=digest,
+                updated_at=datetime.now(timezone.utc),
+            ))
+        return jobs
 
+    @staticmethod
+    def create_exercise(exercise_data):
+        media_jobs = []
+        if "tutorial_key" in exercise_data:
+            ExerciseManager._attach_stored_media(exercise_data)
+        elif current_app.config.get("MEDIA_UPLOADS_INLINE") or not media_workers.started:
+            ExerciseManager._upload_media(exercise_data)
+        else:
+            media_jobs = ExerciseManager._stage_media(exercise_data)
+            exercise_data["media_status"] = MediaStatus.pending
         exercise: ExerciseModel = ExerciseModel(**exercise_data)
 
         try:
@@ -48,20 +366,357 @@ class ExerciseManager(Resource):
                 f"Exercise with name '{exercise.name}' already exists"
             )
         else:
+            for job in media_jobs:
+                job.exercise_pk = exercise.pk
+                db.session.add(job)
+            if media_jobs:
+                db.session.flush()
+                for job in media_jobs:
+                    media_workers.after_commit(ExerciseManager.run_media_job, job.pk, job.key)
+            VersionManager.bump(ExerciseModel.__tablename__)
+            exercise_snapshots.invalidate()
+            # A rolled back create never shows up in the suggestions
+            on_commit(exercise_names.add, [(exercise.pk, exercise.name)])
             return exercise
 
     @staticmethod
-    def get_all_exercises():
-        exercises = db.session.execute(
-            db.select(ExerciseModel)
+    def _locked_exercise(exercise_pk):
+        # Photo and video jobs of one exercise may finish at the same time
+        return db.session.execute(
+            db.select(ExerciseModel).filter_by(pk=exercise_pk).with_for_update()
+        ).scalar_one_or_none()
+
+    @staticmethod
+    def process_media_job(job):
+        """
+            Uploads the staged file and fills in the exercise's URL column,
+            the exercise is ready once none of its jobs are left
+        """
+        if job.media_type == MediaType.photo:
+            column, upload = "photo_tutorial", storage.upload_photo
+        else:
+            column, upload = "video", storage.upload_video
+
+        # Jobs queued before deduplication have no digest
+        key = media_key(job.digest, job.extension) if job.digest else job.key
+        url, variants = MediaObjectManager.lookup([key]).get(key, (None, None)) if job.digest else (None, None)
+        looked_up = url is not None
+        path = os.path.join(MEDIA_QUEUE_FOLDER, job.key)
+        if not looked_up:
+            with open(path, "rb") as stream:
+                stored = ExerciseManager._store_new_media({key: (column, stream, job.extension, upload)})
+            if isinstance(stored[key], HTTPException):
+                raise stored[key]
+            url, variants = stored[key]
+
+        exercise = ExerciseManager._locked_exercise(job.exercise_pk)
+        if exercise is None:
+            # Deleted in the meantime, together with its jobs
+            return
+        if job.digest:
+            with open(path, "rb") as stream:
+                looked_up_files = {key: (column, stream, job.extension, upload)} if looked_up else {}
+                url, variants = MediaObjectManager.acquire(
+                    [(key, url, variants)],
+                    restore=partial(ExerciseManager._restore_media, looked_up_files)
+                )[key]
+        for name, value in ExerciseManager._media_columns(column, url, variants).items():
+            setattr(exercise, name, value)
+        job.status = JobStatus.done
+        job.error = None
+        job.updated_at = datetime.now(timezone.utc)
+
+        unfinished = db.session.execute(
+            db.select(db.func.count(MediaJobModel.pk)).where(
+                MediaJobModel.exercise_pk == exercise.pk,
+                MediaJobModel.status != JobStatus.done,
+            )
+        ).scalar()
+        if not unfinished and exercise.media_status == MediaStatus.pending:
+            exercise.media_status = MediaStatus.ready
+        db.session.flush()
+        VersionManager.bump(ExerciseModel.__tablename__)
+        exercise_snapshots.invalidate()
+
+    @staticmethod
+    def _media_job_failed(job, message):
+        job.error = message
+        job.updated_at = datetime.now(timezone.utc)
+        if job.attempts < MEDIA_JOB_MAX_ATTEMPTS:
+            # resume_media_jobs tries it again
+            job.status = JobStatus.pending
+            return
+
+        job.status = JobStatus.failed
+        exercise = ExerciseManager._locked_exercise(job.exercise_pk)
+        if exercise is not None:
+            exercise.media_status = MediaStatus.failed
+        db.session.flush()
+        VersionManager.bump(ExerciseModel.__tablename__)
+        exercise_snapshots.invalidate()
+
+    @staticmethod
+    def run_media_job(job_pk, key=None):
+        # Runs on media_workers, the claim keeps other workers off the same job
+        now = datetime.now(timezone.utc)
+        claimed = db.session.execute(
+            db.update(MediaJobModel)
+            .where(
+                MediaJobModel.pk == job_pk,
+                db.or_(
+                    MediaJobModel.status == JobStatus.pending,
+                    db.and_(
+                        MediaJobModel.status == JobStatus.running,
+                        MediaJobModel.updated_at < now - timedelta(seconds=MEDIA_JOB_TIMEOUT),
+                    ),
+                ),
+            )
+            .values(status=JobStatus.running, attempts=MediaJobModel.attempts + 1, updated_at=now)
+        ).rowcount
+        db.session.commit()
+        job = db.session.get(MediaJobModel, job_pk)
+        if job is None:
+            # The exercise was deleted before the job ran, together with its jobs
+            if key is not None:
+                _remove_file(os.path.join(MEDIA_QUEUE_FOLDER, key))
+            return
+        if not claimed:
+            return
+
+        path = os.path.join(MEDIA_QUEUE_FOLDER, job.key)
+        try:
+            ExerciseManager.process_media_job(job)
+        except (OSError, HTTPException) as ex:
+            db.session.rollback()
+            job = db.session.get(MediaJobModel, job_pk)
+            if job is not None:
+                ExerciseManager._media_job_failed(job, getattr(ex, "description", None) or str(ex))
+        db.session.commit()
+
+        # Gone when the exercise was deleted while the file uploaded
+        status = db.session.execute(
+            db.select(MediaJobModel.status).filter_by(pk=job_pk)
+        ).scalar_one_or_none()
+        if status != JobStatus.pending:
+            _remove_file(path)
+
+    @staticmethod
+    def resume_media_jobs():
+        now = datetime.now(timezone.utc)
+        job_pks = db.session.execute(
+            db.select(MediaJobModel.pk).where(
+                db.or_(
+                    db.and_(
+                        MediaJobModel.status == JobStatus.pending,
+                        MediaJobModel.updated_at < now - timedelta(seconds=MEDIA_JOB_RETRY_SECONDS),
+                    ),
+                    db.and_(
+                        MediaJobModel.status == JobStatus.running,
+                        MediaJobModel.updated_at < now - timedelta(seconds=MEDIA_JOB_TIMEOUT),
+                    ),
+                )
+            ).order_by(MediaJobModel.pk)
         ).scalars().all()
+        for job_pk in job_pks:
+            media_workers.submit(ExerciseManager.run_media_job, job_pk)
+        return len(job_pks)
+
+    @staticmethod
+    def sweep_media_queue(max_age=MEDIA_JOB_TIMEOUT):
+        """
+            Removes the staged files older than max_age that no pending or
+            running job uploads, left behind by a crash or a deleted
+            exercise. Returns how many files were removed
+        """
+        if not os.path.isdir(MEDIA_QUEUE_FOLDER):
+            return 0
+
+        # Younger files may belong to a request that hasn't committed yet
+        cutoff = time.time() - max_age
+        staged = {}
+        for entry in os.scandir(MEDIA_QUEUE_FOLDER):
+            try:
+                if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                    staged[entry.name] = entry.path
+            except FileNotFoundError:
+                continue
+        if not staged:
+            return 0
+
+        queued = set(db.session.execute(
+            db.select(MediaJobModel.key).where(
+                MediaJobModel.key.in_(staged),
+                MediaJobModel.status.in_([JobStatus.pending, JobStatus.running]),
+            )
+        ).scalars())
+        orphans = staged.keys() - queued
+        for name in orphans:
+            _remove_file(staged[name])
+        return len(orphans)
 
-        if not exercises:
+    @staticmethod
+    def bulk_create_exercises(exercises_data):
+        results = [None] * len(exercises_data)
+        errors = CreateExerciseRequest(many=True).validate(exercises_data)
+        for index, row_errors in errors.items():
+            results[index] = {"index": index, "status": "invalid", "errors": row_errors}
+
+        # Name conflicts are found before anything is uploaded
+        candidates = {}
+        for index, row in enumerate(exercises_data):
+            if results[index] is not None:
+                continue
+            if row["name"] in candidates:
+                results[index] = {
+                    "index": index,
+                    "status": "conflict",
+                    "message": "Duplicate exercise name in this batch",
+                }
+            else:
+                candidates[row["name"]] = index
+
+        taken = db.session.execute(
+            db.select(ExerciseModel.name).where(ExerciseModel.name.in_(candidates))
+        ).scalars().all()
+        for name in taken:
+            index = candidates.pop(name)
+            results[index] = {
+                "index": index,
+                "status": "conflict",
+                "message": f"Exercise with name '{name}' already exists",
+            }
+
+        if not candidates:
+            return results
+
+        # Files are hashed here, then every new one is uploaded once, side by side with the rest
+        rows, row_media = {}, {}
+        with ExitStack() as stack:
+            for name, index in list(candidates.items()):
+                row = dict(exercises_data[index])
+                try:
+                    row_media[index] = ExerciseManager._open_media(row, stack)
+                except HTTPException as ex:
+                    candidates.pop(name)
+                    results[index] = {"index": index, "status": "invalid", "message": ex.description}
+                    continue
+                # Rows of one multi-row insert need the same columns
+                rows[index] = {"photo_tutorial": None, "video": None, **dict.fromkeys(VARIANT_COLUMNS), **row}
+
+            existing = MediaObjectManager.lookup([key for opened in row_media.values() for _, key, *_ in opened])
+            files, looked_up = {}, {}
+            for opened in row_media.values():
+                for column, key, extension, stream, upload in opened:
+                    media = looked_up if key in existing else files
+                    media.setdefault(key, (column, stream, extension, upload))
+            stored = {**ExerciseManager._store_new_media(files), **existing}
+
+            for index, opened in row_media.items():
+                for _, key, *_ in opened:
+                    if isinstance(stored[key], HTTPException):
+                        candidates.pop(rows.pop(index)["name"])
+                        results[index] = {"index": index, "status": "invalid", "message": stored[key].description}
+                        break
+
+            # Only the rows left are counted, once all the uploads are done
+            row_keys = {index: [key for _, key, *_ in row_media[index]] for index in rows}
+            acquired = MediaObjectManager.acquire(
+                [(key, *stored[key]) for keys in row_keys.values() for key in keys],
+                restore=partial(ExerciseManager._restore_media, looked_up)
+            )
+        for index in rows:
+            for column, key, *_ in row_media[index]:
+                rows[index].update(ExerciseManager._media_columns(column, *acquired[key]))
+
+        if rows:
+            inserted = db.session.execute(
+                insert(ExerciseModel)
+                .values(list(rows.values()))
+                .on_conflict_do_nothing(index_elements=["name"])
+                .returning(*schema_columns(ExerciseModel, ExerciseSuperUserResponseSchema))
+            ).all()
+
+            for exercise in inserted:
+                index = candidates.pop(exercise.name)
+                results[index] = {
+                    "index": index,
+                    "status": "created",
+                    "exercise": exercise_super_user_serializer.dump(exercise),
+                }
+            if inserted:
+                VersionManager.bump(ExerciseModel.__tablename__)
+                exercise_snapshots.invalidate()
+                on_commit(exercise_names.add, [(exercise.pk, exercise.name) for exercise in inserted])
+
+        # Whatever is left was created by someone else in the meantime
+        for name, index in candidates.items():
+            MediaObjectManager.release(row_keys[index])
+            results[index] = {
+                "index": index,
+                "status": "conflict",
+                "message": f"Exercise with name '{name}' already exists",
+            }
+        return results
+
+    @staticmethod
+    def get_all_exercises(schema, limit, after=None, exercise_type=None, author=None):
+        # Plain rows with just the schema's columns, nothing goes to the identity map
+        columns = schema_columns(ExerciseModel, schema)
+        # Keyset pagination, one extra row tells if there is a next page
+        query = db.select(*columns).order_by(ExerciseModel.pk).limit(limit + 1)
+        if after is not None:
+            query = query.where(ExerciseModel.pk > after)
+        if exercise_type is not None:
+            query = query.filter_by(exercise_type=exercise_type)
+        if author is not None:
+            query = query.filter_by(author=author)
+
+        exercises = db.session.execute(query).all()
+
+        if not exercises and after is None and exercise_type is None and author is None:
             raise NotFound(
                 "There are no exercises created yet"
             )
 
-        return exercises
+        next_cursor = exercises[limit - 1].pk if len(exercises) > limit else None
+        return exercises[:limit], next_cursor
+
+    @staticmethod
+    def search_exercises(schema, q, limit, after=None):
+        # The GIN index finds the matches, only a bounded set of them is ranked
+        query = db.func.websearch_to_tsquery("english", q)
+        candidates = (
+            db.select(ExerciseModel.pk)
+            .where(ExerciseModel.search_vector.bool_op("@@")(query))
+            .limit(SEARCH_CANDIDATE_LIMIT)
+            .subquery()
+        )
+        rank = db.func.ts_rank_cd(ExerciseModel.search_vector, query).label("rank")
+        # Keyset pagination on (rank, pk), one extra row tells if there is a next page
+        statement = (
+            db.select(*schema_columns(ExerciseModel, schema), rank)
+            .join(candidates, candidates.c.pk == ExerciseModel.pk)
+            .order_by(rank.desc(), ExerciseModel.pk)
+            .limit(limit + 1)
+        )
+        if after is not None:
+            after_rank, after_pk = after
+            statement = statement.where(db.or_(
+                rank < after_rank,
+                db.and_(rank == after_rank, ExerciseModel.pk > after_pk)
+            ))
+        exercises = db.session.execute(statement).all()
+
+        last = exercises[limit - 1] if len(exercises) > limit else None
+        next_cursor = f"{last.rank!r}:{last.pk}" if last is not None else None
+        return exercises[:limit], next_cursor
+
+    @staticmethod
+    def suggest_exercises(prefix, limit):
+        return [
+            {"pk": pk, "name": name}
+            for pk, name in exercise_names.suggest(prefix, limit)
+        ]
 
     @staticmethod
     def get_exercise(exercise_pk):
@@ -81,3 +736,7 @@ class ExerciseManager(Resource):
             raise NotFound("There is no exercise with this pk")
         db.session.delete(exercise)
         db.session.flush()
+        MediaObjectManager.release_urls([exercise.photo_tutorial, exercise.video])
+        VersionManager.bump(ExerciseModel.__tablename__)
+        exercise_snapshots.invalidate()
+        on_commit(exercise_names.remove, exercise.pk, exercise.name)
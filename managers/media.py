@@ -0,0 +1,124 @@
+from collections import Counter
+
+from decouple import config
+from sqlalchemy.dialects.postgresql import insert
+
+from db import db
+from models.media_object import MediaObjectModel
+from services.storage import LazyStorage
+from utils.background import BackgroundWorkers
+from utils.images import variant_key
+
+# S3 or the local folder, see LazyStorage
+storage = LazyStorage()
+
+# Photo and video uploads of new exercises, see ExerciseManager.run_media_job
+media_workers = BackgroundWorkers(
+    max_workers=config("MEDIA_UPLOAD_WORKERS", default=4, cast=int),
+    thread_name_prefix="media-upload",
+)
+
+
+def media_key(digest, extension):
+    return f"media/{digest}.{extension}"
+
+
+class MediaObjectManager:
+    """
+        Reference counts of the content addressed media. Files are looked
+        up without locking and the new ones uploaded, only then are their
+        rows counted, in key order, so the row locks held until the commit
+        never wait on an upload and two batches can't deadlock. A row whose
+        last reference is released stays as a tombstone, with no references,
+        until delete_unreferenced removes it together with its files
+    """
+
+    @staticmethod
+    def lookup(keys):
+        # {key: (url, variants)} of the keys that are stored already
+        rows = db.session.execute(
+            db.select(MediaObjectModel.key, MediaObjectModel.url, MediaObjectModel.variants).where(
+                MediaObjectModel.key.in_(set(keys)),
+                MediaObjectModel.url.is_not(None),
+            )
+        ).all()
+        return {key: (url, variants) for key, url, variants in rows}
+
+    @staticmethod
+    def acquire(references, restore=None):
+        """
+            Counts one reference per (key, url, variants) of stored files.
+            Returns {key: (url, variants)}, the ones of the first upload
+            when the same file was stored by someone else in the meantime.
+            A key with no other references may be a tombstone, or a row
+            deleted since the lookup, whose files are gone. restore(keys)
+            stores those again while their rows are still locked
+        """
+        counts = Counter(key for key, _, _ in references)
+        objects = {key: (url, variants) for key, url, variants in references}
+        acquired = {}
+        unshared = []
+        for key in sorted(counts):
+            url, variants = objects[key]
+            statement = insert(MediaObjectModel).values(
+                key=key, url=url, variants=variants, ref_count=counts[key]
+            )
+            url, variants, ref_count = db.session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=["key"],
+                    set_={
+                        "ref_count": MediaObjectModel.ref_count + counts[key],
+                        # A row without a URL yet takes the ones of this upload
+                        "url": db.func.coalesce(MediaObjectModel.url, statement.excluded.url),
+                        "variants": db.case(
+                            (MediaObjectModel.url.is_(None), statement.excluded.variants),
+                            else_=MediaObjectModel.variants,
+                        ),
+                    }
+                ).returning(MediaObjectModel.url, MediaObjectModel.variants, MediaObjectModel.ref_count)
+            ).one()
+            acquired[key] = (url, variants)
+            if ref_count == counts[key]:
+                unshared.append(key)
+        if unshared and restore is not None:
+            restore(unshared)
+        return acquired
+
+    @staticmethod
+    def release(keys):
+        for key in sorted(keys):
+            ref_count = db.session.execute(
+                db.update(MediaObjectModel)
+                .where(MediaObjectModel.key == key)
+                .values(ref_count=MediaObjectModel.ref_count - 1)
+                .returning(MediaObjectModel.ref_count)
+            ).scalar_one_or_none()
+            if ref_count is not None and ref_count <= 0:
+                # The row stays until its files are deleted, see delete_unreferenced
+                media_workers.after_commit(MediaObjectManager.delete_unreferenced, key)
+
+    @staticmethod
+    def release_urls(urls):
+        # Media from before deduplication isn't counted
+        urls = [url for url in urls if url is not None]
+        keys = dict(db.session.execute(
+            db.select(MediaObjectModel.url, MediaObjectModel.key).where(MediaObjectModel.url.in_(urls))
+        ).all())
+        MediaObjectManager.release([keys[url] for url in urls if url in keys])
+
+    @staticmethod
+    def delete_unreferenced(key):
+        # Runs after the commit, the lock keeps acquire off the row until the files and the row are gone
+        tombstone = db.session.execute(
+            db.select(MediaObjectModel.pk, MediaObjectModel.variants)
+            .where(MediaObjectModel.key == key, MediaObjectModel.ref_count <= 0)
+            .with_for_update()
+        ).first()
+        if tombstone is None:
+            # Counted again in the meantime
+            return
+        storage.delete_object(key)
+        for name in sorted(tombstone.variants or ()):
+            storage.delete_object(variant_key(key, name))
+        db.session.execute(db.delete(MediaObjectModel).where(MediaObjectModel.pk == tombstone.pk))
+        db.session.commit()
@@ -0,0 +1,22 @@
+from managers.auth import token_cache, email_login_limiter, client_login_limiter, revocations
+from managers.exercise import exercise_snapshots, exercise_names
+from managers.user import hasher, registered_emails
+from managers.version import version_cache
+
+
+class MetricsManager:
+    @staticmethod
+    def collect():
+        return {
+            "token_cache": token_cache.stats(),
+            "revocations": revocations.stats(),
+            "password_hashing": hasher.stats(),
+            "email_filter": registered_emails.stats(),
+            "exercise_snapshots": exercise_snapshots.stats(),
+            "exercise_names": exercise_names.stats(),
+            "table_versions": version_cache.stats(),
+            "login_limiter": {
+                "email": email_login_limiter.stats(),
+                "client": client_login_limiter.stats(),
+            },
+        }
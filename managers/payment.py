@@ -3,6 +3,7 @@ from decouple import config
 from werkzeug.exceptions import NotFound
 
 from db import db
+from managers.auth import AuthManager
 from models.enums import RoleType
 from models.user import UserModel
 from services.paypal import PayPalService
@@ -49,3 +50,4 @@ class PaymentManager:
             raise NotFound
         user.role = RoleType.super_user
         db.session.flush()
+        AuthManager.revoke_user_tokens(user.pk)
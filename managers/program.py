@@ -2,8 +2,20 @@ from flask_restful import Resource
 from werkzeug.exceptions import NotFound
 
 from db import db
+from managers.version import VersionManager
 from models.exercise import ExerciseModel
 from models.program import ProgramModel
+from models.relation import ProgramExercise
+
+
+class ProgramRow:
+    # Read-only program for list responses, built without the ORM identity map
+    __slots__ = ("pk", "title", "exercises")
+
+    def __init__(self, pk, title):
+        self.pk = pk
+        self.title = title
+        self.exercises = []
 
 
 class ProgramManager(Resource):
@@ -25,19 +37,34 @@ class ProgramManager(Resource):
         program.exercises = exercises
         db.session.add(program)
         db.session.flush()
+        VersionManager.bump(ProgramModel.__tablename__)
         return program
 
     @staticmethod
     def get_all_programs():
-        exercises = db.session.execute(
-            db.select(ProgramModel)
-        ).scalars().all()
+        programs = {
+            row.pk: ProgramRow(row.pk, row.title)
+            for row in db.session.execute(
+                db.select(ProgramModel.pk, ProgramModel.title).order_by(ProgramModel.pk)
+            )
+        }
 
-        if not exercises:
+        if not programs:
             raise NotFound(
                 "There are no programs created yet!"
             )
-        return exercises
+
+        # Only pk and name of the exercises, the description is never read here
+        exercises = db.session.execute(
+            db.select(ProgramExercise.program_pk, ExerciseModel.pk, ExerciseModel.name)
+            .join(ExerciseModel, ExerciseModel.pk == ProgramExercise.exercise_pk)
+            .where(ProgramExercise.program_pk.in_(programs))
+            .order_by(ExerciseModel.pk)
+        )
+        for exercise in exercises:
+            programs[exercise.program_pk].exercises.append(exercise)
+
+        return list(programs.values())
 
     @staticmethod
     def get_program(program_pk):
@@ -64,3 +91,4 @@ class ProgramManager(Resource):
 
         db.session.delete(program)
         db.session.flush()
+        VersionManager.bump(ProgramModel.__tablename__)
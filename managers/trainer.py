@@ -2,6 +2,7 @@ from flask_restful import Resource
 from werkzeug.exceptions import NotFound, BadRequest
 
 from db import db
+from managers.auth import AuthManager
 from models import UserModel, RoleType
 
 
@@ -28,6 +29,7 @@ class TrainerManager(Resource):
         user.role = RoleType.trainer
         db.session.add(user)
         db.session.flush()
+        AuthManager.revoke_user_tokens(user.pk)
 
     @staticmethod
     def remove_trainer(trainer_pk):
@@ -48,3 +50,4 @@ class TrainerManager(Resource):
         trainer.role = RoleType.user
         db.session.add(trainer)
         db.session.flush()
+        AuthManager.revoke_user_tokens(trainer.pk)
@@ -1,18 +1,108 @@
+import threading
+
+from decouple import config
 from flask_restful import Resource
+from sqlalchemy.dialects.postgresql import insert
 from werkzeug.exceptions import BadRequest, Conflict, NotFound
-from werkzeug.security import check_password_hash, generate_password_hash
 
 from db import db
 from managers.auth import AuthManager
 from models import ProgramModel, UserProgram
 from models.enums import RoleType
 from models.user import UserModel
+from schemas.request.user import UserRegisterSchema
+from services.hashing import PasswordHashingService
+from utils.bloom import BloomFilter
+from utils.cache import register_cache
+
+hasher = PasswordHashingService()
+
+
+class EmailRegistry:
+    """
+        Bloom filter over users.email, warmed from the table on first use.
+        A negative answer is final, a positive one is confirmed with an
+        index-only lookup, so taken emails are found before hashing
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.checks = 0
+        self.positives = 0
+        self.false_positives = 0
+        self._filter = None
+        self._lock = threading.Lock()
+        register_cache(self)
+
+    def _warm(self):
+        with self._lock:
+            if self._filter is None:
+                emails = db.session.execute(
+                    db.select(UserModel.email).execution_options(yield_per=1000)
+                ).scalars()
+                bloom = BloomFilter(self.capacity)
+                for email in emails:
+                    bloom.add(email)
+                self._filter = bloom
+            return self._filter
+
+    def add(self, email):
+        # Not warmed yet, the email gets in with the rest of the table later
+        bloom = self._filter
+        if bloom is None:
+            return
+
+        bloom.add(email)
+        if len(bloom) > self.capacity:
+            # Past its capacity the error rate climbs, so it is rebuilt twice as big
+            self.capacity *= 2
+            self._filter = None
+
+    def is_taken(self, email):
+        bloom = self._warm()
+        self.checks += 1
+        if email not in bloom:
+            return False
+
+        self.positives += 1
+        taken = db.session.execute(
+            db.select(UserModel.email).filter_by(email=email)
+        ).scalar_one_or_none() is not None
+        if not taken:
+            self.false_positives += 1
+        return taken
+
+    def clear(self):
+        with self._lock:
+            self._filter = None
+            self.checks = 0
+            self.positives = 0
+            self.false_positives = 0
+
+    def stats(self):
+        negatives = self.checks - self.positives + self.false_positives
+        return {
+            "size": len(self._filter) if self._filter is not None else 0,
+            "capacity": self.capacity,
+            "checks": self.checks,
+            "positives": self.positives,
+            "false_positives": self.false_positives,
+            "false_positive_rate": self.false_positives / negatives if negatives else 0.0,
+        }
+
+
+registered_emails = EmailRegistry(
+    capacity=config("EMAIL_FILTER_CAPACITY", default=100_000, cast=int)
+)
 
 
 class UserManager(Resource):
     @staticmethod
     def register(user_data):
-        user_data["password"] = generate_password_hash(user_data["password"], method="pbkdf2:sha256")
+        if registered_emails.is_taken(user_data["email"]):
+            raise Conflict("User with this email already exist")
+
+        user_data["password"] = hasher.hash(user_data["password"])
         user_data["role"] = RoleType.user.name
         user = UserModel(**user_data)
 
@@ -20,16 +110,96 @@ class UserManager(Resource):
             db.session.add(user)
             db.session.flush()
         except Exception:
+            # Inserted by another worker, which this filter hasn't seen
+            registered_emails.add(user.email)
             raise Conflict("User with this email already exist")
         else:
+            registered_emails.add(user.email)
             return AuthManager.encode_token(user)
 
+    @staticmethod
+    def bulk_register(users_data):
+        results = [None] * len(users_data)
+        errors = UserRegisterSchema(many=True).validate(users_data)
+        for index, row_errors in errors.items():
+            results[index] = {"index": index, "status": "invalid", "errors": row_errors}
+
+        # Duplicates inside the batch and taken emails are found before any hashing
+        candidates = {}
+        for index, row in enumerate(users_data):
+            if results[index] is not None:
+                continue
+            if row["email"] in candidates:
+                results[index] = {
+                    "index": index,
+                    "status": "conflict",
+                    "message": "Duplicate email in this batch",
+                }
+            else:
+                candidates[row["email"]] = index
+
+        taken = db.session.execute(
+            db.select(UserModel.email).where(UserModel.email.in_(candidates))
+        ).scalars().all()
+        for email in taken:
+            index = candidates.pop(email)
+            results[index] = {
+                "index": index,
+                "status": "conflict",
+                "message": "User with this email already exist",
+            }
+
+        if candidates:
+            indexes = list(candidates.values())
+            passwords = hasher.hash_many([users_data[i]["password"] for i in indexes])
+            rows = [
+                {
+                    "first_name": users_data[i]["first_name"],
+                    "last_name": users_data[i]["last_name"],
+                    "email": users_data[i]["email"],
+                    "password": password,
+                    "role": RoleType.user,
+                }
+                for i, password in zip(indexes, passwords)
+            ]
+            inserted = db.session.execute(
+                insert(UserModel)
+                .values(rows)
+                .on_conflict_do_nothing(index_elements=["email"])
+                .returning(UserModel.pk, UserModel.email, UserModel.role)
+            ).all()
+
+            for user in inserted:
+                index = candidates.pop(user.email)
+                registered_emails.add(user.email)
+                results[index] = {
+                    "index": index,
+                    "status": "created",
+                    "pk": user.pk,
+                    **AuthManager.encode_token(user),
+                }
+
+            # Whatever is left was inserted by someone else in the meantime
+            for email, index in candidates.items():
+                results[index] = {
+                    "index": index,
+                    "status": "conflict",
+                    "message": "User with this email already exist",
+                }
+
+        return results
+
     @staticmethod
     def login(login_data):
         user: UserModel = db.session.execute(db.select(UserModel).filter_by
                                              (email=login_data["email"])).scalar_one_or_none()
-        if user is None or not check_password_hash(user.password, login_data["password"]):
+        if user is None or not hasher.verify(user.password, login_data["password"]):
             raise BadRequest("Invalid email or password")
+
+        # Hashes made with older parameters are upgraded while the password is known
+        if hasher.needs_rehash(user.password):
+            user.password = hasher.hash(login_data["password"])
+            db.session.flush()
         return AuthManager.encode_token(user)
 
     @staticmethod
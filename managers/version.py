@@ -0,0 +1,48 @@
+import hashlib
+
+from decouple import config
+from sqlalchemy.dialects.postgresql import insert
+
+from db import db
+from models.version import TableVersionModel
+from utils.background import on_commit
+from utils.cache import TTLCache
+
+# Revalidations read the versions from here. Writes of this process drop
+# them, writes of other workers show up once the entry expires
+version_cache = TTLCache(maxsize=64, ttl=config("TABLE_VERSION_TTL", default=2, cast=float))
+
+
+class VersionManager:
+    @staticmethod
+    def bump(table_name):
+        # Missing rows start at 1, so the table doesn't need seeding
+        db.session.execute(
+            insert(TableVersionModel)
+            .values(table_name=table_name, version=1)
+            .on_conflict_do_update(
+                index_elements=["table_name"],
+                set_={"version": TableVersionModel.version + 1}
+            )
+        )
+        # Dropped for the rest of this transaction and again after the commit,
+        # other requests may have cached the old versions in between
+        version_cache.invalidate()
+        on_commit(version_cache.invalidate)
+
+    @staticmethod
+    def get_versions(*table_names):
+        versions = version_cache.get(table_names)
+        if versions is None:
+            rows = dict(db.session.execute(
+                db.select(TableVersionModel.table_name, TableVersionModel.version)
+                .where(TableVersionModel.table_name.in_(table_names))
+            ).all())
+            versions = tuple(rows.get(table_name, 0) for table_name in table_names)
+            version_cache.set(table_names, versions)
+        return versions
+
+    @staticmethod
+    def etag(versions, *parts):
+        key = "|".join(str(part) for part in (*parts, *versions))
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
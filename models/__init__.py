@@ -2,3 +2,7 @@ from models.exercise import *
 from models.program import *
 from models.relation import *
 from models.user import *
+from models.token import *
+from models.version import *
+from models.media_job import *
+from models.media_object import *
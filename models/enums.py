@@ -11,3 +11,21 @@ class RoleType(Enum):
 class ExerciseType(Enum):
     heavy_compound = "Heavy compound"
     isolation_exercise = "Isolation exercise"
+
+
+class MediaStatus(Enum):
+    pending = "pending"
+    ready = "ready"
+    failed = "failed"
+
+
+class MediaType(Enum):
+    photo = "photo"
+    video = "video"
+
+
+class JobStatus(Enum):
+    pending = "pending"
+    running = "running"
+    done = "done"
+    failed = "failed"
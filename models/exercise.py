@@ -1,20 +1,46 @@
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, relationship, mapped_column
 
 from db import db
-from models.enums import ExerciseType
+from models.enums import ExerciseType, MediaStatus
 
 
 class ExerciseModel(db.Model):
     __tablename__ = "exercises"
+    # Filtered listings walk these in pk order
+    __table_args__ = (
+        db.Index("ix_exercises_exercise_type_pk", "exercise_type", "pk"),
+        db.Index("ix_exercises_author_pk", "author", "pk"),
+        # Full text search, see ExerciseManager.search_exercises
+        db.Index("ix_exercises_search_vector", "search_vector", postgresql_using="gin"),
+    )
     pk: Mapped[int] = mapped_column(db.Integer, primary_key=True)
     name: Mapped[str] = mapped_column(db.String(50), nullable=False, unique=True)
     description: Mapped[str] = mapped_column(db.String, nullable=False)
     photo_tutorial: Mapped[str] = mapped_column(db.String, nullable=True)
+    # Resized copies of the photo, see utils.images
+    photo_thumbnail: Mapped[str] = mapped_column(db.String, nullable=True)
+    photo_list: Mapped[str] = mapped_column(db.String, nullable=True)
+    photo_detail: Mapped[str] = mapped_column(db.String, nullable=True)
     video: Mapped[str] = mapped_column(db.String, nullable=True)
     exercise_type: Mapped[ExerciseType] = mapped_column(db.Enum(ExerciseType),
                                                         server_default="heavy_compound",
                                                         default=ExerciseType.heavy_compound.name)
     author: Mapped[str] = mapped_column(db.String(201), nullable=False)
+    # Pending while the photo and video are uploaded in the background
+    media_status: Mapped[MediaStatus] = mapped_column(db.Enum(MediaStatus),
+                                                      server_default="ready",
+                                                      default=MediaStatus.ready)
+    # Kept up to date by Postgres, name matches rank above description matches
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        db.Computed(
+            "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+            persisted=True
+        ),
+        deferred=True
+    )
 
     programs = relationship("ProgramModel", secondary="programs_exercises",
                             back_populates="exercises")
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db import db
+from models.enums import JobStatus, MediaType
+
+
+class MediaJobModel(db.Model):
+    """
+        Upload of an exercise's photo or video that runs outside the
+        request, from the file staged in MEDIA_QUEUE_FOLDER under key
+    """
+    __tablename__ = "media_jobs"
+    pk: Mapped[int] = mapped_column(db.Integer, primary_key=True)
+    exercise_pk: Mapped[int] = mapped_column(
+        db.Integer, db.ForeignKey("exercises.pk", ondelete="CASCADE"), nullable=False, index=True
+    )
+    media_type: Mapped[MediaType] = mapped_column(db.Enum(MediaType), nullable=False)
+    key: Mapped[str] = mapped_column(db.String(64), nullable=False, unique=True)
+    extension: Mapped[str] = mapped_column(db.String(10), nullable=False)
+    # sha256 of the staged file, it's stored under media/<digest>.<extension>
+    digest: Mapped[str] = mapped_column(db.String(64), nullable=True)
+    status: Mapped[JobStatus] = mapped_column(db.Enum(JobStatus), nullable=False,
+                                              default=JobStatus.pending, index=True)
+    attempts: Mapped[int] = mapped_column(db.Integer, nullable=False, default=0)
+    error: Mapped[str] = mapped_column(db.String, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(db.DateTime(timezone=True), nullable=False)
@@ -0,0 +1,18 @@
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db import db
+
+
+class MediaObjectModel(db.Model):
+    """
+        Exercise media stored once under its content hash and shared by
+        every exercise with the same file. A row is added once its file is uploaded,
+        and kept with no references until its files are deleted
+    """
+    __tablename__ = "media_objects"
+    pk: Mapped[int] = mapped_column(db.Integer, primary_key=True)
+    key: Mapped[str] = mapped_column(db.String(128), nullable=False, unique=True)
+    url: Mapped[str] = mapped_column(db.String, nullable=True, index=True)
+    ref_count: Mapped[int] = mapped_column(db.Integer, nullable=False)
+    # URLs of a photo's resized copies by name, stored with it under variant_key
+    variants: Mapped[dict] = mapped_column(db.JSON, nullable=True)
@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db import db
+
+
+class RevokedTokenModel(db.Model):
+    """
+        Either a single token, by its jti, or every access
+        token of a user issued before revoked_at
+    """
+    __tablename__ = "revoked_tokens"
+    pk: Mapped[int] = mapped_column(db.Integer, primary_key=True)
+    jti: Mapped[str] = mapped_column(db.String(32), nullable=True, unique=True)
+    user_pk: Mapped[int] = mapped_column(db.Integer, db.ForeignKey("users.pk"), nullable=True, index=True)
+    revoked_at: Mapped[datetime] = mapped_column(db.DateTime(timezone=True), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(db.DateTime(timezone=True), nullable=False, index=True)
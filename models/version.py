@@ -0,0 +1,10 @@
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db import db
+
+
+class TableVersionModel(db.Model):
+    # Bumped on every change of the table, catalog ETags are built from it
+    __tablename__ = "table_versions"
+    table_name: Mapped[str] = mapped_column(db.String(50), primary_key=True)
+    version: Mapped[int] = mapped_column(db.Integer, nullable=False, default=0)
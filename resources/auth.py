@@ -1,9 +1,11 @@
 from flask import request
 from flask_restful import Resource
 
+from managers.auth import AuthManager, auth
 from managers.user import UserManager
-from schemas.request.user import UserRegisterSchema, UserLoginSchema
-from utils.decorators import schema_validator
+from models import RoleType
+from schemas.request.user import UserRegisterSchema, UserLoginSchema, RefreshTokenSchema, BulkUserRegisterSchema
+from utils.decorators import schema_validator, login_rate_limited, permission_required
 
 
 class RegisterUser(Resource):
@@ -15,10 +17,30 @@ class RegisterUser(Resource):
         return new_user, 201
 
 
+class BulkRegisterUsers(Resource):
+    @auth.login_required
+    @permission_required([RoleType.admin])
+    @schema_validator(BulkUserRegisterSchema)
+    def post(self):
+        data = request.get_json()
+        results = UserManager.bulk_register(data["users"])
+        return {"results": results}, 201
+
+
 class LoginUser(Resource):
     @staticmethod
     @schema_validator(UserLoginSchema)
+    @login_rate_limited
     def post():
         data = request.get_json()
         user = UserManager.login(data)
         return user
+
+
+class RefreshToken(Resource):
+    @staticmethod
+    @schema_validator(RefreshTokenSchema)
+    def post():
+        data = request.get_json()
+        tokens = AuthManager.refresh_token(data["refresh_token"])
+        return tokens
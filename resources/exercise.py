@@ -1,21 +1,57 @@
-from flask import request
+import json
+
+from flask import request, Response, g
 from flask_restful import Resource
 
 from managers.auth import auth
-from managers.exercise import ExerciseManager
+from managers.exercise import ExerciseManager, exercise_snapshots
 from models import UserModel
 from models.enums import RoleType
-from schemas.request.exercise import CreateExerciseRequest
-from schemas.response.exercise import ExerciseUserResponseSchema, ExerciseSuperUserResponseSchema
-from utils.decorators import schema_validator, permission_required
+from schemas.request.exercise import (
+    CreateExerciseRequest,
+    BulkCreateExerciseRequest,
+    UploadExerciseRequest,
+    StoredMediaExerciseRequest,
+    MediaUploadRequest,
+    ExerciseListQuerySchema,
+    ExerciseSearchQuerySchema,
+    ExerciseSuggestQuerySchema,
+)
+from schemas.response.exercise import (
+    ExerciseUserResponseSchema,
+    ExerciseSuperUserResponseSchema,
+    exercise_user_serializer,
+    exercise_super_user_serializer,
+)
+from utils.decorators import schema_validator, permission_required, query_validator, conditional_get
+from utils.healpers import request_data
+
+
+def create_exercise_schema():
+    # Multipart files, keys of presigned uploads or base64 in the JSON body
+    if request.mimetype == "multipart/form-data":
+        return UploadExerciseRequest
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and "tutorial_key" in data:
+        return StoredMediaExerciseRequest
+    return CreateExerciseRequest
+
+
+class ExerciseMediaUploads(Resource):
+    @auth.login_required
+    @permission_required([RoleType.trainer])
+    @schema_validator(MediaUploadRequest)
+    def post(self):
+        data = MediaUploadRequest().load(request.get_json())
+        return ExerciseManager.prepare_uploads(data)
 
 
 class CreateExercise(Resource):
     @auth.login_required
     @permission_required([RoleType.trainer])
-    @schema_validator(CreateExerciseRequest)
+    @schema_validator(create_exercise_schema)
     def post(self):
-        data = request.get_json()
+        data = create_exercise_schema()().load(request_data())
         exercise = ExerciseManager.create_exercise(data)
 
         return ExerciseSuperUserResponseSchema().dump(
@@ -23,21 +59,77 @@ class CreateExercise(Resource):
         ), 201
 
 
+class BulkCreateExercises(Resource):
+    @auth.login_required
+    @permission_required([RoleType.trainer])
+    @schema_validator(BulkCreateExerciseRequest)
+    def post(self):
+        data = request.get_json()
+        results = ExerciseManager.bulk_create_exercises(data["exercises"])
+        return {"results": results}, 201
+
+
 class AllExercisesList(Resource):
     @auth.login_required
+    @conditional_get(["exercises"])
+    @query_validator(ExerciseListQuerySchema)
+    def get(self):
+        user: UserModel = auth.current_user()
+        schema, serializer = (
+            (ExerciseUserResponseSchema, exercise_user_serializer)
+            if user.role == RoleType.user
+            else (ExerciseSuperUserResponseSchema, exercise_super_user_serializer)
+        )
+
+        def build():
+            query = ExerciseListQuerySchema().load(request.args)
+            exercises, next_cursor = ExerciseManager.get_all_exercises(schema, **query)
+            return json.dumps({
+                "exercises": serializer.dump(exercises, many=True),
+                "next": next_cursor
+            }).encode("utf-8")
+
+        # The encoded body is kept per schema variant and rebuilt once per catalog change
+        body = exercise_snapshots.get_or_build(
+            (schema.__name__, request.full_path),
+            g.table_versions,
+            build
+        )
+        return Response(body, mimetype="application/json")
+
+
+class ExerciseSearch(Resource):
+    @auth.login_required
+    @conditional_get(["exercises"])
+    @query_validator(ExerciseSearchQuerySchema)
     def get(self):
-        exercises = ExerciseManager.get_all_exercises()
         user: UserModel = auth.current_user()
+        schema, serializer = (
+            (ExerciseUserResponseSchema, exercise_user_serializer)
+            if user.role == RoleType.user
+            else (ExerciseSuperUserResponseSchema, exercise_super_user_serializer)
+        )
+
+        query = ExerciseSearchQuerySchema().load(request.args)
+        exercises, next_cursor = ExerciseManager.search_exercises(schema, **query)
         return {
-            "exercises":
-                ExerciseUserResponseSchema().dump(exercises, many=True)
-                if user.role == RoleType.user
-                else ExerciseSuperUserResponseSchema().dump(exercises, many=True)
+            "exercises": serializer.dump(exercises, many=True),
+            "next": next_cursor
         }
 
 
+class ExerciseSuggest(Resource):
+    # Called on every keystroke, served from memory without touching the database
+    @auth.login_required
+    @query_validator(ExerciseSuggestQuerySchema)
+    def get(self):
+        query = ExerciseSuggestQuerySchema().load(request.args)
+        return {"exercises": ExerciseManager.suggest_exercises(**query)}
+
+
 class SpecificExercise(Resource):
     @auth.login_required
+    @conditional_get(["exercises"])
     def get(self, exercise_pk):
         exercise = ExerciseManager.get_exercise(exercise_pk)
         user: UserModel = auth.current_user()
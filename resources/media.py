@@ -0,0 +1,37 @@
+import os
+import re
+
+from flask import send_from_directory
+from flask_restful import Resource
+from werkzeug.exceptions import NotFound
+
+from managers.media import storage
+from services.storage import LocalStorage
+
+# media/<sha256>.<extension> and its variants never change once written
+CONTENT_ADDRESSED_KEY = re.compile(r"^media/[0-9a-f]{64}(\.[a-z]+)?\.[A-Za-z0-9]{1,10}$")
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+class MediaFile(Resource):
+    """
+        Photos and videos of the local storage backend, with S3 clients
+        get them from the bucket. send_file streams the file through
+        wsgi.file_wrapper, so sendfile under gunicorn, answers Range
+        requests with 206 and matching validators with 304
+    """
+
+    def get(self, key):
+        backend = storage.backend
+        if not isinstance(backend, LocalStorage):
+            raise NotFound()
+
+        if CONTENT_ADDRESSED_KEY.match(key):
+            # The name holds the content hash, so it's a strong ETag and the file can be cached for good
+            response = send_from_directory(
+                backend.folder, key, etag=os.path.basename(key), max_age=IMMUTABLE_MAX_AGE
+            )
+            response.cache_control.immutable = True
+            return response
+        # Anything else is revalidated against its mtime and size on every view
+        return send_from_directory(backend.folder, key, max_age=0)
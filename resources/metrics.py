@@ -0,0 +1,13 @@
+from flask_restful import Resource
+
+from managers.auth import auth
+from managers.metrics import MetricsManager
+from models import RoleType
+from utils.decorators import permission_required
+
+
+class Metrics(Resource):
+    @auth.login_required
+    @permission_required([RoleType.admin])
+    def get(self):
+        return MetricsManager.collect()
@@ -5,8 +5,8 @@ from managers.auth import auth
 from managers.program import ProgramManager
 from models.enums import RoleType
 from schemas.request.program import ProgramRequestSchema
-from schemas.response.program import ProgramResponseSchema
-from utils.decorators import schema_validator, permission_required
+from schemas.response.program import ProgramResponseSchema, program_serializer
+from utils.decorators import schema_validator, permission_required, conditional_get
 
 
 class CreateProgram(Resource):
@@ -21,13 +21,15 @@ class CreateProgram(Resource):
 
 class AllProgramsList(Resource):
     @auth.login_required
+    @conditional_get(["programs", "exercises"])
     def get(self):
         programs = ProgramManager.get_all_programs()
-        return {"programs": ProgramResponseSchema().dump(programs, many=True)}
+        return {"programs": program_serializer.dump(programs, many=True)}
 
 
 class SpecificProgram(Resource):
     @auth.login_required
+    @conditional_get(["programs", "exercises"])
     def get(self, program_pk):
         program = ProgramManager.get_program(program_pk)
         return ProgramResponseSchema().dump(program)
@@ -1,5 +1,16 @@
-from resources.auth import RegisterUser, LoginUser
-from resources.exercise import CreateExercise, AllExercisesList, SpecificExercise, DeleteExercise
+from resources.auth import RegisterUser, LoginUser, RefreshToken, BulkRegisterUsers
+from resources.exercise import (
+    CreateExercise,
+    ExerciseMediaUploads,
+    BulkCreateExercises,
+    AllExercisesList,
+    ExerciseSearch,
+    ExerciseSuggest,
+    SpecificExercise,
+    DeleteExercise,
+)
+from resources.media import MediaFile
+from resources.metrics import Metrics
 from resources.payment import InitiatePayment, PaymentSuccess, PaymentCancel
 from resources.program import CreateProgram, AllProgramsList, SpecificProgram, DeleteProgram
 from resources.trainer import CreateTrainer, DeleteTrainer
@@ -8,9 +19,14 @@ from resources.user import AddProgramToUser, UserProgramsList, UserSpecificProgr
 routes = (
     (RegisterUser, "/register"),
     (LoginUser, "/login"),
+    (RefreshToken, "/token/refresh"),
     (CreateExercise, "/trainers/exercise"),
+    (ExerciseMediaUploads, "/trainers/exercise/uploads"),
+    (BulkCreateExercises, "/trainers/exercises"),
     (CreateProgram, "/trainers/program"),
     (AllExercisesList, "/exercise"),
+    (ExerciseSearch, "/exercise/search"),
+    (ExerciseSuggest, "/exercise/suggest"),
     (AllProgramsList, "/program"),
     (SpecificExercise, "/exercise/<int:exercise_pk>"),
     (SpecificProgram, "/program/<int:program_pk>"),
@@ -24,5 +40,8 @@ routes = (
     (CreateTrainer, "/admin/set/trainer/<int:user_pk>"),
     (DeleteTrainer, "/admin/remove/trainer/<int:trainer_pk>"),
     (DeleteProgram, "/admin/delete/program/<int:program_pk>"),
-    (UserDeleteProgram, "/user/delete/program/<int:program_pk>")
+    (UserDeleteProgram, "/user/delete/program/<int:program_pk>"),
+    (Metrics, "/admin/metrics"),
+    (BulkRegisterUsers, "/admin/register/users"),
+    (MediaFile, "/media/<path:key>")
 )
@@ -3,7 +3,7 @@ from flask_restful import Resource
 from managers.auth import auth
 from managers.user import UserManager
 from models import RoleType
-from schemas.response.program import ProgramResponseSchema
+from schemas.response.program import ProgramResponseSchema, program_serializer
 from utils.decorators import permission_required
 
 
@@ -25,7 +25,7 @@ class UserProgramsList(Resource):
     def get(self):
         user = auth.current_user()
         programs = UserManager.get_all_user_programs(user)
-        return ProgramResponseSchema().dump(
+        return program_serializer.dump(
             programs, many=True
         )
 
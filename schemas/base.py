@@ -1,6 +1,6 @@
 from marshmallow import Schema, fields, validate
 
-from utils.validators import password_validator  # , validate_email
+from utils.validators import password_validator, validate_full_name  # , validate_email
 
 
 class BaseUserSchema(Schema):
@@ -22,3 +22,9 @@ class BaseProgramSchema(Schema):
             validate.Length(min=3, max=50)
         )
     )
+
+
+class BaseExerciseSchema(Schema):
+    name = fields.String(required=True, validate=validate.And(validate.Length(min=4, max=50)))
+    description = fields.String(required=True, validate=validate.And(validate.Length(min=50)))
+    author = fields.String(required=True, validate=validate_full_name)
@@ -0,0 +1,141 @@
+from marshmallow import fields, missing, Schema
+from marshmallow.decorators import PRE_DUMP, POST_DUMP
+from marshmallow.utils import ensure_text_type
+from sqlalchemy.engine import Row
+
+"""
+    Response schemas compiled once into plain functions, with the same
+    output as Schema().dump(). Integer, String (URL, Email), Nested and
+    List fields are inlined, any other field is serialized by marshmallow
+    itself, and schemas with dump hooks are not compiled at all
+"""
+
+
+_plain_types = {}
+
+
+def _is_plain(cls):
+    # Marshmallow tries obj[key] first on anything with __getitem__, e.g. dicts.
+    # Rows reject string keys, so for them getattr gives the same value
+    plain = _plain_types.get(cls)
+    if plain is None:
+        plain = _plain_types[cls] = not hasattr(cls, "__getitem__") or issubclass(cls, Row)
+    return plain
+
+
+class CompiledSchema:
+    def __init__(self, schema: Schema, _compiling=()):
+        self.schema = schema
+        self._dump_one = None
+        if not (schema._hooks[PRE_DUMP] or schema._hooks[POST_DUMP]):
+            self._dump_one = _SchemaCompiler(schema, _compiling).compile()
+
+    def dump(self, obj, *, many=None):
+        if self._dump_one is None:
+            return self.schema.dump(obj, many=many)
+
+        many = self.schema.many if many is None else bool(many)
+        if many and obj is not None:
+            dump_one = self._dump_one
+            return [dump_one(item) for item in obj]
+        return self._dump_one(obj)
+
+
+class _SchemaCompiler:
+    def __init__(self, schema, compiling):
+        self.schema = schema
+        self.compiling = (*compiling, type(schema))
+        self.namespace = {
+            "missing": missing,
+            "_is_plain": _is_plain,
+            "_text": ensure_text_type,
+            "_schema_dump": schema.dump,
+            "_get_attribute": schema.get_attribute,
+        }
+        self.counter = 0
+
+    def _name(self, prefix, value):
+        self.counter += 1
+        name = f"_{prefix}_{self.counter}"
+        self.namespace[name] = value
+        return name
+
+    def _format(self, field, value):
+        """
+            Expression formatting `value` the way field._serialize does,
+            None when the field type can't be inlined
+        """
+        cls = type(field)
+        if cls._serialize is fields.String._serialize:
+            return f"(None if {value} is None else {value} if {value}.__class__ is str else _text({value}))"
+
+        if cls._serialize is fields.Number._serialize and cls._format_num is fields.Number._format_num:
+            num_type = self._name("num", field.num_type)
+            if field.as_string:
+                return f"(None if {value} is None else str({num_type}({value})))"
+            return f"(None if {value} is None else {num_type}({value}))"
+
+        if cls._serialize is fields.Nested._serialize:
+            nested_schema = field.schema
+            if type(nested_schema) in self.compiling:
+                return None
+            nested = CompiledSchema(nested_schema, self.compiling)
+            many = nested_schema.many or field.many
+            dump = self._name("nested", lambda obj: nested.dump(obj, many=many))
+            return f"(None if {value} is None else {dump}({value}))"
+
+        if cls._serialize is fields.List._serialize:
+            self.counter += 1
+            item = f"item_{self.counter}"
+            inner = self._format(field.inner, item)
+            if inner is None:
+                return None
+            return f"(None if {value} is None else [{inner} for {item} in {value}])"
+
+        return None
+
+    def compile(self):
+        schema = self.schema
+        if schema.dict_class is not dict:
+            return None
+
+        lines = [
+            "def dump(obj):",
+            "    if not _is_plain(obj.__class__):",
+            "        return _schema_dump(obj, many=False)",
+            "    ret = {}",
+        ]
+        for attr_name, field in schema.dump_fields.items():
+            key = repr(field.data_key if field.data_key is not None else attr_name)
+            attribute = field.attribute if field.attribute is not None else attr_name
+            expression = None
+            if (
+                type(field).serialize is fields.Field.serialize
+                and field._CHECK_ATTRIBUTE
+                and field.dump_default is missing
+                and "." not in attribute
+            ):
+                expression = self._format(field, "value")
+
+            if expression is None:
+                serialize = self._name("serialize", field.serialize)
+                lines += [
+                    f"    value = {serialize}({attr_name!r}, obj, accessor=_get_attribute)",
+                    "    if value is not missing:",
+                    f"        ret[{key}] = value",
+                ]
+            else:
+                lines += [
+                    f"    value = getattr(obj, {attribute!r}, missing)",
+                    "    if value is not missing:",
+                    f"        ret[{key}] = {expression}",
+                ]
+        lines.append("    return ret")
+
+        exec(compile("\n".join(lines), f"<compiled {type(schema).__name__}>", "exec"), self.namespace)
+        return self.namespace["dump"]
+
+
+def compile_schema(schema):
+    # Accepts the schema class or an instance, e.g. one built with only=...
+    return CompiledSchema(schema() if isinstance(schema, type) else schema)
@@ -1,18 +1,92 @@
-from marshmallow import Schema, validate, fields
+import os
 
-from utils.validators import validate_full_name
+from decouple import config
+from marshmallow import Schema, validate, fields, post_load
 
+from models.enums import ExerciseType
+from schemas.base import BaseExerciseSchema
+from utils.validators import EXTENSION_PATTERN, validate_upload
 
-class CreateExerciseRequest(Schema):
-    name = fields.String(required=True, validate=validate.And(validate.Length(min=4, max=50)))
-    description = fields.String(required=True, validate=validate.And(validate.Length(min=50)))
-    tutorial_photo = fields.String(required=True)
-    tutorial_extension = fields.String(required=True)
-    # TODO Video is Base64, change it
+# An empty extension, along with an empty video, is an exercise without one
+OPTIONAL_EXTENSION_PATTERN = r"^([A-Za-z0-9]{1,10})?$"
+UPLOAD_KEY_PATTERN = r"^uploads/[0-9a-f]{32}\.[A-Za-z0-9]{1,10}$"
+# The rank and pk of the last search result, "<rank>:<pk>"
+SEARCH_CURSOR_PATTERN = r"^\d+(\.\d+)?(e[+-]\d+)?:\d+$"
+
+
+class CreateExerciseRequest(BaseExerciseSchema):
+    # Base64 in the JSON body, kept for clients that can't send multipart
+    tutorial_photo = fields.String(required=True, validate=validate.Length(min=1))
+    tutorial_extension = fields.String(required=True, validate=validate.Regexp(EXTENSION_PATTERN))
+    # Empty strings for an exercise without a video
     video_example = fields.String(required=True)
-    video_extension = fields.String(required=True)
-    author = fields.String(required=True, validate=validate_full_name)
+    video_extension = fields.String(required=True, validate=validate.Regexp(OPTIONAL_EXTENSION_PATTERN))
+
+
+class UploadExerciseRequest(BaseExerciseSchema):
+    # multipart/form-data, the files are streamed to disk by the form parser
+    tutorial_photo = fields.Raw(required=True, validate=validate_upload)
+    video_example = fields.Raw(load_default=None, validate=validate_upload)
+
+    @post_load
+    def add_extensions(self, data, **kwargs):
+        for file_field, extension_field in (
+            ("tutorial_photo", "tutorial_extension"),
+            ("video_example", "video_extension"),
+        ):
+            upload = data[file_field]
+            data[extension_field] = (
+                os.path.splitext(upload.filename)[1][1:].lower() if upload is not None else None
+            )
+        return data
+
+
+class StoredMediaExerciseRequest(BaseExerciseSchema):
+    # Keys handed out by MediaUploadRequest, the files are already in the bucket
+    tutorial_key = fields.String(required=True, validate=validate.Regexp(UPLOAD_KEY_PATTERN))
+    video_key = fields.String(load_default=None, validate=validate.Regexp(UPLOAD_KEY_PATTERN))
+
+
+class MediaUploadRequest(Schema):
+    tutorial_extension = fields.String(required=True, validate=validate.Regexp(EXTENSION_PATTERN))
+    video_extension = fields.String(load_default=None, validate=validate.Regexp(EXTENSION_PATTERN))
+
+
+class BulkCreateExerciseRequest(Schema):
+    # Every item is validated with CreateExerciseRequest, so one bad item doesn't fail the batch
+    exercises = fields.List(
+        fields.Raw(),
+        required=True,
+        validate=validate.Length(min=1, max=config("BULK_EXERCISE_LIMIT", default=100, cast=int))
+    )
 
 
 class ExerciseProgramRequest(Schema):
     pk = fields.Integer(required=True)
+
+
+class ExerciseListQuerySchema(Schema):
+    limit = fields.Integer(load_default=50, validate=validate.Range(min=1, max=100))
+    # Keyset cursor, the "next" value of the previous page
+    after = fields.Integer(load_default=None, validate=validate.Range(min=0))
+    exercise_type = fields.Enum(ExerciseType, load_default=None)
+    author = fields.String(load_default=None)
+
+
+class ExerciseSearchQuerySchema(Schema):
+    q = fields.String(required=True, validate=validate.Length(min=1, max=100))
+    limit = fields.Integer(load_default=20, validate=validate.Range(min=1, max=100))
+    # Keyset cursor, the "next" value of the previous page
+    after = fields.String(load_default=None, validate=validate.Regexp(SEARCH_CURSOR_PATTERN))
+
+    @post_load
+    def split_cursor(self, data, **kwargs):
+        if data["after"] is not None:
+            rank, pk = data["after"].split(":")
+            data["after"] = (float(rank), int(pk))
+        return data
+
+
+class ExerciseSuggestQuerySchema(Schema):
+    prefix = fields.String(required=True, validate=validate.Length(min=1, max=50))
+    limit = fields.Integer(load_default=10, validate=validate.Range(min=1, max=50))
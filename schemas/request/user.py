@@ -1,4 +1,5 @@
-from marshmallow import fields, validate
+from decouple import config
+from marshmallow import Schema, fields, validate
 
 from schemas.base import BaseUserSchema
 
@@ -10,3 +11,16 @@ class UserRegisterSchema(BaseUserSchema):
 
 class UserLoginSchema(BaseUserSchema):
     pass
+
+
+class RefreshTokenSchema(Schema):
+    refresh_token = fields.String(required=True)
+
+
+class BulkUserRegisterSchema(Schema):
+    # Every row is validated with UserRegisterSchema, so one bad row doesn't fail the batch
+    users = fields.List(
+        fields.Raw(),
+        required=True,
+        validate=validate.Length(min=1, max=config("BULK_REGISTER_LIMIT", default=50, cast=int))
+    )
@@ -1,18 +1,31 @@
 from marshmallow import fields, Schema, validate
 
+from models.enums import MediaStatus
+from schemas.compiler import compile_schema
+
 
 class ExerciseUserResponseSchema(Schema):
     pk = fields.Integer()
     name = fields.String()
     description = fields.String()
     photo_tutorial = fields.URL()
+    # List views only need the thumbnail, all three fall back to None
+    photo_thumbnail = fields.URL()
+    photo_list = fields.URL()
+    photo_detail = fields.URL()
 
 
 class ExerciseSuperUserResponseSchema(ExerciseUserResponseSchema):
     video = fields.URL()
+    # Pending until the background upload fills in the URLs
+    media_status = fields.Enum(MediaStatus)
 
 
 class ExerciseProgramResponse(Schema):
     pk = fields.Integer()
     name = fields.String(required=True,
                          validate=validate.And(validate.Length(min=4, max=50)))
+
+
+exercise_user_serializer = compile_schema(ExerciseUserResponseSchema)
+exercise_super_user_serializer = compile_schema(ExerciseSuperUserResponseSchema)
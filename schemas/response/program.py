@@ -1,9 +1,13 @@
 from marshmallow import fields
 
 from schemas.base import BaseProgramSchema
+from schemas.compiler import compile_schema
 from schemas.response.exercise import ExerciseProgramResponse
 
 
 class ProgramResponseSchema(BaseProgramSchema):
     pk = fields.Integer()
     exercises = fields.List(fields.Nested(ExerciseProgramResponse))
+
+
+program_serializer = compile_schema(ProgramResponseSchema)
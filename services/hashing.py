@@ -0,0 +1,89 @@
+import threading
+
+from decouple import config
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from utils.pools import worker_pool
+
+
+class PasswordHashingService:
+    """
+        Runs pbkdf2 in a bounded pool of worker processes, so the
+        request threads only wait for the result. When more than
+        max_queue hashes are pending, new ones are rejected with 503
+    """
+
+    def __init__(self):
+        self.iterations = config("PASSWORD_HASH_ITERATIONS", default=1_000_000, cast=int)
+        self.workers = config("PASSWORD_HASH_WORKERS", default=2, cast=int)
+        self.max_queue = config("PASSWORD_HASH_QUEUE", default=32, cast=int)
+        self.method = f"pbkdf2:sha256:{self.iterations}"
+        self.pending = 0
+        self._slots = threading.BoundedSemaphore(self.max_queue)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = worker_pool(self.workers)
+            return self._executor
+
+    def _run(self, work, permits=1):
+        # One slot per hash, all of them or none
+        acquired = 0
+        while acquired < permits and self._slots.acquire(blocking=False):
+            acquired += 1
+        if acquired < permits:
+            for _ in range(acquired):
+                self._slots.release()
+            raise ServiceUnavailable("Server is busy, please try again later")
+
+        with self._lock:
+            self.pending += permits
+        try:
+            return work(self.executor)
+        finally:
+            with self._lock:
+                self.pending -= permits
+            for _ in range(permits):
+                self._slots.release()
+
+    def hash(self, password):
+        return self._run(
+            lambda executor: executor.submit(generate_password_hash, password, self.method).result()
+        )
+
+    def hash_many(self, passwords):
+        """
+            Hashes a batch a few passwords at a time, one slot each, so
+            logins and registrations queue between the chunks instead of
+            behind the whole batch. A full queue fails it with 503
+        """
+        hashes = []
+        for start in range(0, len(passwords), self.workers):
+            chunk = passwords[start:start + self.workers]
+            hashes.extend(self._run(
+                lambda executor: list(executor.map(generate_password_hash, chunk, [self.method] * len(chunk))),
+                permits=len(chunk),
+            ))
+        return hashes
+
+    def verify(self, password_hash, password):
+        return self._run(
+            lambda executor: executor.submit(check_password_hash, password_hash, password).result()
+        )
+
+    def needs_rehash(self, password_hash):
+        # Hashes look like "pbkdf2:sha256:<iterations>$<salt>$<hash>"
+        return password_hash.split("$", 1)[0] != self.method
+
+    def stats(self):
+        return {
+            "method": self.method,
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_queue": self.max_queue,
+        }
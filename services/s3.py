@@ -1,4 +1,8 @@
+from functools import cached_property
+
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from decouple import config
 from werkzeug.exceptions import BadRequest
@@ -10,32 +14,83 @@ class S3Service:
         self.aws_secret = config("AWS_SECRET")
         self.aws_region = config("AWS_REGION")
         self.aws_bucket = config("AWS_BUCKET")
-        self.s3 = boto3.client(
+        # Points the client at an S3 compatible server, e.g. MinIO for local runs
+        self.endpoint_url = config("AWS_ENDPOINT_URL", default=None)
+        self.presigned_expiration = config("AWS_PRESIGNED_EXPIRATION", default=900, cast=int)
+        # Files above the threshold go up in chunks, max_concurrency parts at a time
+        self.transfer_config = TransferConfig(
+            multipart_threshold=config("S3_MULTIPART_THRESHOLD", default=8 * 1024 * 1024, cast=int),
+            multipart_chunksize=config("S3_MULTIPART_CHUNKSIZE", default=8 * 1024 * 1024, cast=int),
+            max_concurrency=config("S3_MAX_CONCURRENCY", default=10, cast=int),
+        )
+        # Enough for a photo and a video in flight on every upload thread, botocore keeps 10
+        self.max_pool_connections = config("S3_MAX_POOL_CONNECTIONS", default=50, cast=int)
+
+    @cached_property
+    def s3(self):
+        # Built on first use, not when the managers are imported
+        return boto3.client(
             "s3",
             aws_access_key_id=self.aws_key,
             aws_secret_access_key=self.aws_secret,
+            region_name=self.aws_region,
+            endpoint_url=self.endpoint_url,
+            config=Config(max_pool_connections=self.max_pool_connections),
         )
 
-    def upload_photo(self, path, key, extension):
+    def object_url(self, key):
+        if self.endpoint_url:
+            return f"{self.endpoint_url.rstrip('/')}/{self.aws_bucket}/{key}"
+        return f"https://{self.aws_bucket}.s3.{self.aws_region}.amazonaws.com/{key}"
+
+    def upload_photo(self, fileobj, key, extension):
         try:
-            self.s3.upload_file(
-                path,
+            self.s3.upload_fileobj(
+                fileobj,
                 self.aws_bucket,
                 key,
-                ExtraArgs={"ContentType": f"video/{extension}"}
+                ExtraArgs={"ContentType": f"image/{extension}"},
+                Config=self.transfer_config,
             )
-            return f"https://{self.aws_bucket}.s3.{self.aws_region}.amazonaws.com/{key}"
+            return self.object_url(key)
         except ClientError:
             raise BadRequest("Unable to upload photo")
 
-    def upload_video(self, path, key, extension):
+    def upload_video(self, fileobj, key, extension):
         try:
-            self.s3.upload_file(
-                path,
+            self.s3.upload_fileobj(
+                fileobj,
                 self.aws_bucket,
                 key,
                 ExtraArgs={"ContentType": f"video/{extension}"},
+                Config=self.transfer_config,
             )
-            return f"https://{self.aws_bucket}.s3.{self.aws_region}.amazonaws.com/{key}"
+            return self.object_url(key)
         except ClientError:
             raise BadRequest("Unable to upload video")
+
+    def delete_object(self, key):
+        try:
+            self.s3.delete_object(Bucket=self.aws_bucket, Key=key)
+        except ClientError:
+            raise BadRequest("Unable to delete file")
+
+    def presigned_upload(self, key, content_type):
+        # The client PUTs the file itself, with the same Content-Type header
+        try:
+            return self.s3.generate_presigned_url(
+                "put_object",
+                Params={"Bucket": self.aws_bucket, "Key": key, "ContentType": content_type},
+                ExpiresIn=self.presigned_expiration,
+            )
+        except ClientError:
+            raise BadRequest("Unable to prepare the upload")
+
+    def object_exists(self, key):
+        try:
+            self.s3.head_object(Bucket=self.aws_bucket, Key=key)
+        except ClientError as ex:
+            if ex.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise BadRequest("Unable to check the uploaded file")
+        return True
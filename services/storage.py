@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+import threading
+
+from decouple import config
+from werkzeug.exceptions import BadRequest
+from werkzeug.security import safe_join
+
+from constants import ROOT_DIR
+
+
+class LocalStorage:
+    """
+        Media in a folder of this host, served back by the MediaFile
+        resource. Same methods as S3Service, without any network calls
+    """
+
+    def __init__(self, folder=None, base_url=None):
+        folder = folder or config("LOCAL_STORAGE_FOLDER", default="media_files")
+        # Relative to the project root, the same folder for the writes and for send_from_directory
+        self.folder = os.path.abspath(os.path.join(ROOT_DIR, folder))
+        self.base_url = base_url or config("LOCAL_STORAGE_URL", default="http://localhost:5000/media")
+
+    def path(self, key):
+        # None for keys that would point outside of the folder
+        return safe_join(self.folder, key)
+
+    def object_url(self, key):
+        return f"{self.base_url.rstrip('/')}/{key}"
+
+    def _save(self, fileobj, key, message):
+        path = self.path(key)
+        if path is None:
+            raise BadRequest(message)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Readers see the old file or the whole new one, never a partial write
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix=".upload-", delete=False) as temp:
+                try:
+                    shutil.copyfileobj(fileobj, temp)
+                    temp.flush()
+                    os.fsync(temp.fileno())
+                except BaseException:
+                    os.remove(temp.name)
+                    raise
+            os.replace(temp.name, path)
+        except OSError:
+            raise BadRequest(message)
+        return self.object_url(key)
+
+    def upload_photo(self, fileobj, key, extension):
+        return self._save(fileobj, key, "Unable to upload photo")
+
+    def upload_video(self, fileobj, key, extension):
+        return self._save(fileobj, key, "Unable to upload video")
+
+    def delete_object(self, key):
+        path = self.path(key)
+        try:
+            if path is not None:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            raise BadRequest("Unable to delete file")
+
+    def presigned_upload(self, key, content_type):
+        raise BadRequest("Direct uploads need the S3 storage backend")
+
+    def object_exists(self, key):
+        path = self.path(key)
+        return path is not None and os.path.isfile(path)
+
+
+class LazyStorage:
+    """
+        The backend picked by STORAGE_BACKEND, "s3" or "local". It's built
+        on first use, so importing the managers reads no AWS settings
+    """
+
+    def __init__(self):
+        self._backend = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = self._create(config("STORAGE_BACKEND", default="s3"))
+        return self._backend
+
+    @staticmethod
+    def _create(name):
+        if name == "local":
+            return LocalStorage()
+        if name == "s3":
+            # boto3 is only imported by the processes that use it
+            from services.s3 import S3Service
+            return S3Service()
+        raise ValueError(f"Unknown STORAGE_BACKEND '{name}', expected 's3' or 'local'")
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
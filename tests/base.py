@@ -4,6 +4,7 @@ from config import create_app
 from db import db
 from tests.factories import UserFactory
 from tests.helpers import generate_token
+from utils.cache import clear_caches
 
 
 class BaseAPITest(TestCase):
@@ -16,6 +17,7 @@ class BaseAPITest(TestCase):
     def tearDown(self):
         db.session.remove()
         db.drop_all()
+        clear_caches()
 
     def base_register_test(self, data, status_code):
 
@@ -3,6 +3,7 @@ from factory.base import T
 from werkzeug.security import generate_password_hash
 
 from db import db
+from managers.version import VersionManager
 from models import UserModel, RoleType, ExerciseModel, ExerciseType, ProgramModel
 
 
@@ -21,6 +22,8 @@ class BaseFactory(factory.Factory):
 
         db.session.add(factory_object)
         db.session.flush()
+        # Same as the managers, so the catalog caches see the new rows
+        VersionManager.bump(factory_object.__tablename__)
         return factory_object
 
 
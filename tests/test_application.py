@@ -1,6 +1,17 @@
-from models import RoleType, UserModel
+import threading
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import jwt
+from decouple import config
+from werkzeug.security import generate_password_hash
+
+from db import db
+from managers.auth import token_cache, Principal, email_login_limiter, revocations
+from managers.user import hasher, registered_emails
+from models import RevokedTokenModel, RoleType, UserModel
 from tests.base import BaseAPITest
-from tests.factories import UserFactory
+from tests.factories import UserFactory, ProgramFactory
 from tests.helpers import generate_token
 
 
@@ -237,6 +248,26 @@ class TestRegisterSchema(BaseAPITest):
             }
         )
 
+    def test_register_duplicating_email_skips_hashing(self):
+        data = self.base_user()
+        self.base_register_test(data, 201)
+
+        with patch.object(hasher, "hash") as mock_hash:
+            self.base_register_test(data, 409)
+
+        mock_hash.assert_not_called()
+        self.objects_count_in_database(UserModel, 1)
+
+    def test_register_email_filter_false_positive(self):
+        data = self.base_user()
+        self.base_register_test(data, 201)
+
+        # Removed behind the filter's back, so the filter still answers "maybe"
+        db.session.execute(db.delete(UserModel))
+
+        self.base_register_test(data, 201)
+        self.assertEqual(registered_emails.false_positives, 1)
+
 
 class TestLoginSchemas(BaseAPITest):
 
@@ -313,3 +344,391 @@ class TestLoginSchemas(BaseAPITest):
                     "Invalid email or password"
             }
         )
+
+    def test_login_rehashes_outdated_password(self):
+        data = self.base_user()
+        self.base_register_test(data, 201)
+
+        user = db.session.execute(
+            db.select(UserModel).filter_by(email=data["email"])
+        ).scalar_one()
+        user.password = generate_password_hash(
+            data["password"],
+            method="pbkdf2:sha256:1000"
+        )
+        db.session.flush()
+
+        resp = self.client.post("/login", json={
+            "email": data["email"],
+            "password": data["password"]
+        })
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(hasher.needs_rehash(user.password))
+
+    def test_login_throttled_per_email(self):
+        data = self.base_user()
+        self.base_register_test(data, 201)
+        login_data = {
+            "email": data["email"],
+            "password": "WrongPassword1#"
+        }
+
+        for _ in range(email_login_limiter.capacity):
+            resp = self.client.post("/login", json=login_data)
+            self.assertEqual(resp.status_code, 400)
+
+        # Even the right password is rejected before it gets checked
+        login_data["password"] = data["password"]
+        with patch.object(hasher, "verify") as mock_verify:
+            resp = self.client.post("/login", json=login_data)
+
+        self.assertEqual(resp.status_code, 429)
+        self.assertEqual(
+            resp.json,
+            {
+                "message":
+                    "Too many login attempts, please try again later"
+            }
+        )
+        self.assertIn("Retry-After", resp.headers)
+        mock_verify.assert_not_called()
+
+    def test_login_busy_hashing_service(self):
+        data = self.base_user()
+        self.base_register_test(data, 201)
+
+        # Taking the only slot, so the login can't be queued
+        slots = threading.BoundedSemaphore(1)
+        slots.acquire()
+
+        with patch.object(hasher, "_slots", slots):
+            resp = self.client.post("/login", json={
+                "email": data["email"],
+                "password": data["password"]
+            })
+
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(
+            resp.json,
+            {
+                "message":
+                    "Server is busy, please try again later"
+            }
+        )
+
+
+class TestTokenCache(BaseAPITest):
+    ENDPOINT = "/user/program"
+
+    def test_token_cache_reuses_verified_token(self):
+        header = self.create_token_and_header()
+
+        self.client.get(self.ENDPOINT, headers=header)
+        self.client.get(self.ENDPOINT, headers=header)
+
+        stats = token_cache.stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 1)
+
+    def test_token_cache_dropped_on_role_change(self):
+        user = UserFactory()
+        header = self.create_token_and_header(user)
+        admin_header = self.create_token_and_header(
+            UserFactory(role=RoleType.admin)
+        )
+
+        self.client.get(self.ENDPOINT, headers=header)
+        self.client.put(f"/admin/set/trainer/{user.pk}", headers=admin_header)
+
+        # The token issued before the role change is revoked
+        resp = self.client.get(self.ENDPOINT, headers=header)
+
+        self.assertEqual(resp.status_code, 401)
+
+
+@patch("managers.auth.AUTH_MODE", "claims")
+class TestClaimsAuthMode(BaseAPITest):
+    def test_claims_mode_permissions_use_token_role(self):
+        user = UserFactory()
+        header = self.create_token_and_header(user)
+
+        resp = self.client.post("/trainers/program", headers=header)
+
+        self.assertEqual(resp.status_code, 403)
+
+    def test_claims_mode_loads_user_when_needed(self):
+        program = ProgramFactory()
+        user = UserFactory()
+        header = self.create_token_and_header(user)
+
+        resp = self.client.post(
+            f"/user/add/program/{program.pk}",
+            headers=header
+        )
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn(program, user.programs)
+
+    def test_claims_mode_principal_is_lazy(self):
+        user = UserFactory()
+        principal = Principal(user.pk, RoleType.user)
+
+        self.assertIsNone(principal._user)
+        self.assertEqual(principal.email, user.email)
+        self.assertIsNotNone(principal._user)
+
+
+class TestMetrics(BaseAPITest):
+    ENDPOINT = "/admin/metrics"
+
+    def test_metrics_unauthenticated(self):
+        self.base_unauthenticated_test("get", self.ENDPOINT)
+
+    def test_metrics_unauthorized(self):
+        self.base_unauthorized_test("get", self.ENDPOINT)
+
+    def test_metrics_successfully(self):
+        header = self.create_token_and_header(
+            UserFactory(role=RoleType.admin)
+        )
+
+        resp = self.client.get(self.ENDPOINT, headers=header)
+
+        self.assertEqual(resp.status_code, 200)
+        for section in ("token_cache", "password_hashing", "email_filter"):
+            self.assertIn(section, resp.json)
+
+
+class TestRefreshToken(BaseAPITest):
+    ENDPOINT = "/token/refresh"
+
+    def register_and_get_tokens(self):
+        resp = self.base_register_test(self.base_user(), 201)
+        return resp.json
+
+    def test_refresh_token_missing_data(self):
+        resp = self.client.post(self.ENDPOINT, json={})
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("refresh_token", resp.json["message"])
+
+    def test_refresh_token_successfully(self):
+        tokens = self.register_and_get_tokens()
+
+        resp = self.client.post(
+            self.ENDPOINT,
+            json={"refresh_token": tokens["refresh_token"]}
+        )
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp.json["token"], tokens["token"])
+        self.assertNotEqual(resp.json["refresh_token"], tokens["refresh_token"])
+
+        resp = self.client.get(
+            "/user/program",
+            headers={"Authorization": f"Bearer {resp.json['token']}"}
+        )
+        self.assertEqual(resp.status_code, 404)
+
+    def test_refresh_token_used_twice(self):
+        tokens = self.register_and_get_tokens()
+        data = {"refresh_token": tokens["refresh_token"]}
+
+        self.client.post(self.ENDPOINT, json=data)
+        resp = self.client.post(self.ENDPOINT, json=data)
+
+        self.assertEqual(resp.status_code, 401)
+        self.assertEqual(
+            resp.json,
+            {
+                "message":
+                    "Refresh token was already used"
+            }
+        )
+
+    def test_access_token_cant_refresh(self):
+        tokens = self.register_and_get_tokens()
+
+        resp = self.client.post(
+            self.ENDPOINT,
+            json={"refresh_token": tokens["token"]}
+        )
+
+        self.assertEqual(resp.status_code, 401)
+
+    def test_refresh_token_cant_authenticate(self):
+        tokens = self.register_and_get_tokens()
+
+        resp = self.client.get(
+            "/user/program",
+            headers={"Authorization": f"Bearer {tokens['refresh_token']}"}
+        )
+
+        self.assertEqual(resp.status_code, 401)
+
+    def test_refresh_after_role_change(self):
+        tokens = self.register_and_get_tokens()
+        user = db.session.execute(
+            db.select(UserModel).filter_by(email=self.base_user()["email"])
+        ).scalar_one()
+        admin_header = self.create_token_and_header(
+            UserFactory(role=RoleType.admin)
+        )
+
+        self.client.put(f"/admin/set/trainer/{user.pk}", headers=admin_header)
+        resp = self.client.get(
+            "/user/program",
+            headers={"Authorization": f"Bearer {tokens['token']}"}
+        )
+        self.assertEqual(resp.status_code, 401)
+
+        resp = self.client.post(
+            self.ENDPOINT,
+            json={"refresh_token": tokens["refresh_token"]}
+        )
+        resp = self.client.get(
+            "/user/program",
+            headers={"Authorization": f"Bearer {resp.json['token']}"}
+        )
+
+        # The new token carries the trainer role
+        self.assertEqual(resp.status_code, 403)
+
+    @patch("managers.auth.AUTH_MODE", "claims")
+    def test_legacy_token_stays_revoked(self):
+        user = UserFactory()
+        admin_header = self.create_token_and_header(
+            UserFactory(role=RoleType.admin)
+        )
+        # No type and no jti, valid for 5 days like before refresh tokens
+        now = datetime.now(timezone.utc)
+        legacy_token = jwt.encode(
+            {"sub": user.pk, "iat": now.timestamp(), "exp": now + timedelta(days=5), "role": user.role.name},
+            key=config("SECRET_KEY"),
+            algorithm="HS256"
+        )
+
+        self.client.put(f"/admin/set/trainer/{user.pk}", headers=admin_header)
+
+        # Still revoked once the access token lifetime has passed
+        with patch("managers.auth.datetime") as mock_datetime:
+            mock_datetime.now.return_value = now + timedelta(days=1)
+            mock_datetime.fromtimestamp = datetime.fromtimestamp
+            revocations.clear()
+            resp = self.client.get(
+                "/user/program",
+                headers={"Authorization": f"Bearer {legacy_token}"}
+            )
+        self.assertEqual(resp.status_code, 401)
+
+    def test_expired_revocations_are_purged(self):
+        user = UserFactory()
+        now = datetime.now(timezone.utc)
+        db.session.add_all([
+            RevokedTokenModel(jti="a" * 32, revoked_at=now - timedelta(days=6), expires_at=now - timedelta(days=1)),
+            RevokedTokenModel(jti="b" * 32, revoked_at=now, expires_at=now + timedelta(days=1)),
+        ])
+        db.session.flush()
+
+        # The filter is rebuilt for the first token checked
+        resp = self.client.get("/user/program", headers=self.create_token_and_header(user))
+
+        self.assertEqual(resp.status_code, 404)
+        self.assertEqual(
+            db.session.execute(db.select(RevokedTokenModel.jti)).scalars().all(),
+            ["b" * 32]
+        )
+
+
+class TestBulkRegister(BaseAPITest):
+    ENDPOINT = "/admin/register/users"
+
+    def test_bulk_register_unauthenticated(self):
+        self.base_unauthenticated_test("post", self.ENDPOINT)
+
+    def test_bulk_register_unauthorized(self):
+        self.base_unauthorized_test("post", self.ENDPOINT)
+
+    def test_bulk_register_empty_batch(self):
+        header = self.create_token_and_header(
+            UserFactory(role=RoleType.admin)
+        )
+
+        resp = self.client.post(self.ENDPOINT, headers=header, json={"users": []})
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("users", resp.json["message"])
+
+    def test_bulk_register_successfully(self):
+        admin = UserFactory(role=RoleType.admin)
+        header = self.create_token_and_header(admin)
+
+        valid_user = self.base_user()
+        second_user = self.base_user()
+        second_user["email"] = "tosho_the_break89@abv.bg"
+        invalid_user = self.base_user()
+        invalid_user["email"] = "kiro"
+        taken_user = self.base_user()
+        taken_user["email"] = admin.email
+
+        resp = self.client.post(self.ENDPOINT, headers=header, json={
+            "users": [valid_user, invalid_user, valid_user, taken_user, second_user]
+        })
+
+        self.assertEqual(resp.status_code, 201)
+        statuses = [result["status"] for result in resp.json["results"]]
+        self.assertEqual(
+            statuses,
+            ["created", "invalid", "conflict", "conflict", "created"]
+        )
+        self.assertIn("email", resp.json["results"][1]["errors"])
+        self.assertIn("token", resp.json["results"][0])
+        self.objects_count_in_database(UserModel, 3)
+
+        resp = self.client.post("/login", json={
+            "email": second_user["email"],
+            "password": second_user["password"]
+        })
+        self.assertEqual(resp.status_code, 200)
+
+    def test_bulk_register_busy_hashing_service(self):
+        header = self.create_token_and_header(
+            UserFactory(role=RoleType.admin)
+        )
+        second_user = self.base_user()
+        second_user["email"] = "tosho_the_break89@abv.bg"
+
+        # Every password needs its own slot, one is taken by a login
+        slots = threading.BoundedSemaphore(2)
+        slots.acquire()
+
+        with patch.object(hasher, "_slots", slots):
+            resp = self.client.post(self.ENDPOINT, headers=header, json={
+                "users": [self.base_user(), second_user]
+            })
+
+            self.assertEqual(resp.status_code, 503)
+            self.objects_count_in_database(UserModel, 1)
+            # The slot it did get is given back
+            self.assertTrue(slots.acquire(blocking=False))
+            self.assertFalse(slots.acquire(blocking=False))
+
+    def test_bulk_register_hashes_in_chunks(self):
+        header = self.create_token_and_header(
+            UserFactory(role=RoleType.admin)
+        )
+        users = []
+        for number in range(hasher.workers * 2 + 1):
+            user = self.base_user()
+            user["email"] = f"user{number}@abv.bg"
+            users.append(user)
+
+        with patch.object(hasher, "_run", wraps=hasher._run) as mock_run:
+            resp = self.client.post(self.ENDPOINT, headers=header, json={"users": users})
+
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(
+            [call.kwargs["permits"] for call in mock_run.call_args_list],
+            [hasher.workers, hasher.workers, 1]
+        )
@@ -1,11 +1,47 @@
+import base64
 import copy
-from unittest.mock import patch
-
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch, PropertyMock
+
+from PIL import Image
+from werkzeug.exceptions import BadRequest
+
+from constants import MEDIA_QUEUE_FOLDER
 from db import db
-from models import ExerciseModel, RoleType, UserModel
+from managers.exercise import (
+    exercise_snapshots,
+    exercise_names,
+    ExerciseManager,
+    MEDIA_JOB_MAX_ATTEMPTS,
+    MEDIA_JOB_RETRY_SECONDS,
+    MEDIA_JOB_TIMEOUT,
+)
+from managers.media import MediaObjectManager, media_workers
+from managers.version import VersionManager, version_cache
+from models import (
+    ExerciseModel,
+    RoleType,
+    UserModel,
+    ExerciseType,
+    MediaJobModel,
+    MediaObjectModel,
+    MediaType,
+    MediaStatus,
+    JobStatus,
+)
+from schemas.request.exercise import CreateExerciseRequest
+from schemas.response.exercise import ExerciseUserResponseSchema
 from services.s3 import S3Service
 from tests.base import BaseAPITest
 from tests.factories import UserFactory, ExerciseFactory
+from utils.background import BackgroundWorkers
 
 
 class TestGettingExercises(BaseAPITest):
@@ -122,6 +158,352 @@ class TestGettingExercises(BaseAPITest):
                 user,
             )
 
+    def test_get_all_exercises_paginated(self):
+        exercises = [ExerciseFactory(name=f"Exercise {i}") for i in range(5)]
+        header = self.create_token_and_header()
+
+        resp = self.client.get(
+            f"{self.GET_ALL_ENDPOINT}?limit=2",
+            headers=header
+        )
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(
+            [exercise["pk"] for exercise in resp.json["exercises"]],
+            [exercises[0].pk, exercises[1].pk]
+        )
+        self.assertEqual(resp.json["next"], exercises[1].pk)
+
+        resp = self.client.get(
+            f"{self.GET_ALL_ENDPOINT}?limit=2&after={resp.json['next']}",
+            headers=header
+        )
+        self.assertEqual(
+            [exercise["pk"] for exercise in resp.json["exercises"]],
+            [exercises[2].pk, exercises[3].pk]
+        )
+
+        resp = self.client.get(
+            f"{self.GET_ALL_ENDPOINT}?limit=2&after={resp.json['next']}",
+            headers=header
+        )
+        self.assertEqual(len(resp.json["exercises"]), 1)
+        self.assertIsNone(resp.json["next"])
+
+    def test_get_all_exercises_filtered(self):
+        ExerciseFactory(author="Kiro")
+        isolation = ExerciseFactory(
+            author="Tosho",
+            exercise_type=ExerciseType.isolation_exercise
+        )
+        header = self.create_token_and_header()
+
+        for query in ("exercise_type=isolation_exercise", "author=Tosho"):
+            resp = self.client.get(
+                f"{self.GET_ALL_ENDPOINT}?{query}",
+                headers=header
+            )
+
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(
+                [exercise["pk"] for exercise in resp.json["exercises"]],
+                [isolation.pk]
+            )
+
+    def test_get_all_exercises_invalid_query(self):
+        header = self.create_token_and_header()
+
+        resp = self.client.get(
+            f"{self.GET_ALL_ENDPOINT}?limit=0&exercise_type=cardio",
+            headers=header
+        )
+
+        self.assertEqual(resp.status_code, 400)
+        for field in ("limit", "exercise_type"):
+            self.assertIn(field, resp.json["message"])
+
+    def test_get_exercises_not_modified(self):
+        exercise = ExerciseFactory()
+        ExerciseFactory()
+        header = self.create_token_and_header()
+
+        resp = self.client.get(self.GET_ALL_ENDPOINT, headers=header)
+        etag = resp.headers["ETag"]
+
+        resp = self.client.get(
+            self.GET_ALL_ENDPOINT,
+            headers={**header, "If-None-Match": etag}
+        )
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.data, b"")
+
+        # Deleting an exercise changes the version of the table
+        admin_header = self.create_token_and_header(
+            UserFactory(role=RoleType.admin)
+        )
+        self.client.delete(
+            f"/admin/delete/exercise/{exercise.pk}",
+            headers=admin_header
+        )
+
+        resp = self.client.get(
+            self.GET_ALL_ENDPOINT,
+            headers={**header, "If-None-Match": etag}
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp.headers["ETag"], etag)
+
+    def test_get_exercises_revalidated_from_cached_versions(self):
+        ExerciseFactory()
+        header = self.create_token_and_header()
+
+        resp = self.client.get(self.GET_ALL_ENDPOINT, headers=header)
+        with patch.object(db.session, "execute", wraps=db.session.execute) as mock_execute:
+            resp = self.client.get(
+                self.GET_ALL_ENDPOINT,
+                headers={**header, "If-None-Match": resp.headers["ETag"]}
+            )
+
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(version_cache.stats()["hits"], 1)
+        mock_execute.assert_not_called()
+
+    def test_table_versions_invalidated_after_commit(self):
+        table_name = ExerciseModel.__tablename__
+        versions = VersionManager.get_versions(table_name)
+
+        VersionManager.bump(table_name)
+        self.assertEqual(VersionManager.get_versions(table_name), (versions[0] + 1,))
+
+        # Another request read the versions before the bump was committed
+        version_cache.set((table_name,), versions)
+        db.session.commit()
+
+        self.assertEqual(VersionManager.get_versions(table_name), (versions[0] + 1,))
+
+    def test_get_exercises_etag_depends_on_role(self):
+        exercise = ExerciseFactory()
+        endpoint = f"/exercise/{exercise.pk}"
+
+        user_resp = self.client.get(
+            endpoint,
+            headers=self.create_token_and_header()
+        )
+        super_user_header = self.create_token_and_header(
+            UserFactory(role=RoleType.super_user)
+        )
+        resp = self.client.get(
+            endpoint,
+            headers={**super_user_header, "If-None-Match": user_resp.headers["ETag"]}
+        )
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("video", resp.json["exercise"])
+
+    def test_get_all_exercises_snapshot_reused(self):
+        ExerciseFactory()
+        header = self.create_token_and_header()
+
+        first = self.client.get(self.GET_ALL_ENDPOINT, headers=header)
+        second = self.client.get(self.GET_ALL_ENDPOINT, headers=header)
+
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(exercise_snapshots.stats()["misses"], 1)
+        self.assertEqual(exercise_snapshots.stats()["hits"], 1)
+
+        # Super users get the other variant, built separately
+        super_user_header = self.create_token_and_header(
+            UserFactory(role=RoleType.super_user)
+        )
+        resp = self.client.get(self.GET_ALL_ENDPOINT, headers=super_user_header)
+
+        self.assertIn("video", str(resp.json))
+        self.assertEqual(exercise_snapshots.stats()["misses"], 2)
+
+    def test_get_all_exercises_selects_schema_columns(self):
+        ExerciseFactory()
+        db.session.expunge_all()
+
+        exercises, _ = ExerciseManager.get_all_exercises(
+            ExerciseUserResponseSchema,
+            limit=10
+        )
+
+        self.assertEqual(
+            set(exercises[0]._fields),
+            {"pk", "name", "description", "photo_tutorial", "photo_thumbnail", "photo_list", "photo_detail"}
+        )
+        self.assertEqual(len(db.session.identity_map), 0)
+
+
+class TestSearchingExercises(BaseAPITest):
+    ENDPOINT = "/exercise/search"
+
+    def test_search_exercises_unauthenticated(self):
+        self.base_unauthenticated_test(
+            "get",
+            f"{self.ENDPOINT}?q=squat"
+        )
+
+    def test_search_exercises_missing_query(self):
+        header = self.create_token_and_header()
+
+        resp = self.client.get(self.ENDPOINT, headers=header)
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("q", resp.json["message"])
+
+    def test_search_exercises_ranked(self):
+        in_description = ExerciseFactory(
+            name="Goblet hold",
+            description="Hold the kettlebell at the chest and squat down slowly"
+        )
+        in_name = ExerciseFactory(name="Front squat")
+        ExerciseFactory(name="Bench press")
+        header = self.create_token_and_header()
+
+        resp = self.client.get(f"{self.ENDPOINT}?q=squats", headers=header)
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(
+            [exercise["pk"] for exercise in resp.json["exercises"]],
+            [in_name.pk, in_description.pk]
+        )
+        self.assertNotIn("video", resp.json["exercises"][0])
+        self.assertIsNone(resp.json["next"])
+
+    def test_search_exercises_paginated(self):
+        exercises = [ExerciseFactory(name=f"Split squat {i}") for i in range(3)]
+        header = self.create_token_and_header(UserFactory(role=RoleType.trainer))
+
+        resp = self.client.get(f"{self.ENDPOINT}?q=squat&limit=2", headers=header)
+
+        self.assertEqual(
+            [exercise["pk"] for exercise in resp.json["exercises"]],
+            [exercises[0].pk, exercises[1].pk]
+        )
+        self.assertIn("video", resp.json["exercises"][0])
+        self.assertTrue(resp.json["next"].endswith(f":{exercises[1].pk}"))
+
+        resp = self.client.get(
+            f"{self.ENDPOINT}?q=squat&limit=2&after={resp.json['next']}",
+            headers=header
+        )
+
+        self.assertEqual(
+            [exercise["pk"] for exercise in resp.json["exercises"]],
+            [exercises[2].pk]
+        )
+        self.assertIsNone(resp.json["next"])
+
+    def test_search_exercises_invalid_cursor(self):
+        header = self.create_token_and_header()
+
+        resp = self.client.get(f"{self.ENDPOINT}?q=squat&after=2", headers=header)
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("after", resp.json["message"])
+
+    @patch("managers.exercise.SEARCH_CANDIDATE_LIMIT", 2)
+    def test_search_exercises_caps_ranked_matches(self):
+        for i in range(3):
+            ExerciseFactory(name=f"Split squat {i}")
+        header = self.create_token_and_header()
+
+        resp = self.client.get(f"{self.ENDPOINT}?q=squat", headers=header)
+
+        self.assertEqual(len(resp.json["exercises"]), 2)
+        self.assertIsNone(resp.json["next"])
+
+    def test_search_exercises_no_matches(self):
+        ExerciseFactory(name="Bench press")
+        header = self.create_token_and_header()
+
+        resp = self.client.get(f"{self.ENDPOINT}?q=deadlift", headers=header)
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json, {"exercises": [], "next": None})
+
+
+class TestSuggestingExercises(BaseAPITest):
+    ENDPOINT = "/exercise/suggest"
+
+    def test_suggest_exercises_unauthenticated(self):
+        self.base_unauthenticated_test(
+            "get",
+            f"{self.ENDPOINT}?prefix=be"
+        )
+
+    def test_suggest_exercises_missing_prefix(self):
+        header = self.create_token_and_header()
+
+        resp = self.client.get(self.ENDPOINT, headers=header)
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("prefix", resp.json["message"])
+
+    def test_suggest_exercises_successfully(self):
+        bench = ExerciseFactory(name="Bench press")
+        bent_over = ExerciseFactory(name="bent over row")
+        ExerciseFactory(name="Back squat")
+        ExerciseFactory(name="Incline bench press")
+        header = self.create_token_and_header(UserFactory(role=RoleType.trainer))
+
+        resp = self.client.get(f"{self.ENDPOINT}?prefix=BEN", headers=header)
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(
+            resp.json["exercises"],
+            [
+                {"pk": bench.pk, "name": "Bench press"},
+                {"pk": bent_over.pk, "name": "bent over row"},
+            ]
+        )
+
+        resp = self.client.get(f"{self.ENDPOINT}?prefix=b&limit=1", headers=header)
+        self.assertEqual(len(resp.json["exercises"]), 1)
+
+    def test_suggest_exercises_after_delete(self):
+        exercise = ExerciseFactory(name="Bench press")
+        header = self.create_token_and_header(UserFactory(role=RoleType.admin))
+
+        resp = self.client.get(f"{self.ENDPOINT}?prefix=bench", headers=header)
+        self.assertEqual(len(resp.json["exercises"]), 1)
+
+        self.client.delete(f"/admin/delete/exercise/{exercise.pk}", headers=header)
+        # The index changes once the delete is committed
+        db.session.commit()
+
+        resp = self.client.get(f"{self.ENDPOINT}?prefix=bench", headers=header)
+        self.assertEqual(resp.json["exercises"], [])
+        self.assertEqual(exercise_names.stats()["lookups"], 2)
+
+    @patch.object(S3Service, "upload_photo", return_value="some.s3.url")
+    @patch.object(S3Service, "upload_video", return_value="some.s3_video.url")
+    def test_suggest_exercises_after_commit(self, mock_s3_upload_video, mock_s3_upload_photo):
+        header = self.create_token_and_header(UserFactory(role=RoleType.trainer))
+        self.assertEqual(exercise_names.suggest("bench", 10), [])
+
+        resp = self.client.post(
+            "/trainers/exercise", headers=header, json=TestCreatingExercise.VALID_EXERCISE_DATA
+        )
+        self.assertEqual(resp.status_code, 201)
+
+        # Not before the commit, and never once it's rolled back
+        self.assertEqual(exercise_names.suggest("bench", 10), [])
+        db.session.rollback()
+        self.assertEqual(exercise_names.suggest("bench", 10), [])
+
+        resp = self.client.post(
+            "/trainers/exercise", headers=header, json=TestCreatingExercise.VALID_EXERCISE_DATA
+        )
+        db.session.commit()
+
+        self.assertEqual(
+            exercise_names.suggest("bench", 10),
+            [(resp.json["pk"], "Bench press")]
+        )
+
 
 class TestCreatingExercise(BaseAPITest):
     ENDPOINT = "/trainers/exercise"
@@ -371,6 +753,258 @@ class TestCreatingExercise(BaseAPITest):
             1
         )
 
+    def test_create_exercise_uploads_photo_and_video_concurrently(self):
+        video_started = threading.Event()
+
+        def upload_photo(fileobj, key, extension):
+            # Only returns if the video upload is running at the same time
+            self.assertTrue(video_started.wait(timeout=5))
+            return "some.s3.url"
+
+        def upload_video(fileobj, key, extension):
+            video_started.set()
+            return "some.s3_video.url"
+
+        header = self.create_token_and_header(UserFactory(role=RoleType.trainer))
+        with patch.object(S3Service, "upload_photo", side_effect=upload_photo), \
+                patch.object(S3Service, "upload_video", side_effect=upload_video):
+            resp = self.client.post(
+                self.ENDPOINT,
+                headers=header,
+                json=self.VALID_EXERCISE_DATA
+            )
+
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.json["photo_tutorial"], "some.s3.url")
+        self.assertEqual(resp.json["video"], "some.s3_video.url")
+
+    def test_create_exercise_with_photo_variants(self):
+        uploaded = {}
+
+        def upload(fileobj, key, extension):
+            uploaded[key] = fileobj.read()
+            return f"some.s3.url/{key}"
+
+        photo = io.BytesIO()
+        Image.new("RGB", (2000, 1000), "red").save(photo, "PNG")
+        data = {**self.VALID_EXERCISE_DATA, "tutorial_photo": base64.b64encode(photo.getvalue()).decode()}
+        header = self.create_token_and_header(UserFactory(role=RoleType.trainer))
+
+        with patch.object(S3Service, "upload_photo", side_effect=upload), \
+                patch.object(S3Service, "upload_video", side_effect=upload):
+            resp = self.client.post(self.ENDPOINT, headers=header, json=data)
+
+        self.assertEqual(resp.status_code, 201)
+        photo_key = resp.json["photo_tutorial"].removeprefix("some.s3.url/")
+        self.assertEqual(uploaded[photo_key], photo.getvalue())
+        for name, size in (("thumbnail", 160), ("list", 480), ("detail", 1280)):
+            key = resp.json[f"photo_{name}"].removeprefix("some.s3.url/")
+            self.assertTrue(key.endswith(f".{name}.webp"))
+            with Image.open(io.BytesIO(uploaded[key])) as variant:
+                self.assertEqual((variant.format, variant.size), ("WEBP", (size, size // 2)))
+
+        # Not a picture Pillow can read, the photo is still kept as it is
+        data["name"] = "Incline bench press"
+        data["tutorial_photo"] = self.VALID_EXERCISE_DATA["tutorial_photo"]
+        with patch.object(S3Service, "upload_photo", side_effect=upload), \
+                patch.object(S3Service, "upload_video", side_effect=upload):
+            resp = self.client.post(self.ENDPOINT, headers=header, json=data)
+
+        self.assertEqual(resp.status_code, 201)
+        self.assertIsNotNone(resp.json["photo_tutorial"])
+        self.assertIsNone(resp.json["photo_thumbnail"])
+
+    def multipart_exercise_data(self, **files):
+        data = {
+            key: self.VALID_EXERCISE_DATA[key]
+            for key in ("name", "description", "author")
+        }
+        for field, (content, filename) in files.items():
+            data[field] = (io.BytesIO(content), filename)
+        return data
+
+    def test_create_exercise_multipart_successfully(self):
+        uploaded = {}
+
+        def upload(fileobj, key, extension):
+            uploaded[extension] = (key, fileobj.read())
+            return f"some.s3.url/{key}"
+
+        header = self.create_token_and_header(UserFactory(role=RoleType.trainer))
+        data = self.multipart_exercise_data(
+            tutorial_photo=(b"photo bytes", "tutorial.PNG"),
+            video_example=(b"video bytes" * 1000, "example.mp4"),
+        )
+
+        with patch.object(S3Service, "upload_photo", side_effect=upload), \
+                patch.object(S3Service, "upload_video", side_effect=upload):
+            resp = self.client.post(
+                self.ENDPOINT,
+                headers=header,
+                data=data,
+                content_type="multipart/form-data"
+            )
+
+        self.assertEqual(resp.status_code, 201)
+        photo_key, photo = uploaded["png"]
+        video_key, video = uploaded["mp4"]
+        self.assertTrue(photo_key.endswith(".png"))
+        self.assertEqual(photo, b"photo bytes")
+        self.assertEqual(video, b"video bytes" * 1000)
+        self.assertEqual(resp.json["photo_tutorial"], f"some.s3.url/{photo_key}")
+        self.assertEqual(resp.json["video"], f"some.s3.url/{video_key}")
+
+    @patch.object(S3Service, "upload_photo", return_value="some.s3.url")
+    @patch.object(S3Service, "upload_video", return_value="some.s3_video.url")
+    def test_create_exercise_multipart_without_video(self, mock_s3_upload_video, mock_s3_upload_photo):
+        header = self.create_token_and_header(UserFactory(role=RoleType.trainer))
+
+        resp = self.client.post(
+            self.ENDPOINT,
+            headers=header,
+            data=self.multipart_exercise_data(tutorial_photo=(b"photo bytes", "tutorial.jpg")),
+            content_type="multipart/form-data"
+        )
+
+        self.assertEqual(resp.status_code, 201)
+        self.assertIsNone(resp.json["video"])
+        mock_s3_upload_photo.assert_called_once()
+        mock_s3_upload_video.assert_not_called()
+
+    def test_create_exercise_multipart_missing_photo(self):
+        header = self.create_token_and_header(UserFactory(role=RoleType.trainer))
+
+        resp = self.client.post(
+            self.ENDPOINT,
+            headers=header,
+            data=self.multipart_exercise_data(video_example=(b"video bytes", "example")),
+            content_type="multipart/form-data"
+        )
+
+        self.assertEqual(resp.status_code, 400)
+        for field in ("tutorial_photo", "video_example", "File name needs an extension"):
+            self.assertIn(field, resp.json["message"])
+        self.objects_count_in_database(ExerciseModel, 0)
+
+    def test_create_exercise_multipart_invalid_extension(self):
+        header = self.create_token_and_header(UserFactory(role=RoleType.trainer))
+
+        resp = self.client.post(
+            self.ENDPOINT,
+            headers=header,
+            data=self.multipart_exercise_data(tutorial_photo=(b"photo bytes", "tutorial.p-n g")),
+            content_type="multipart/form-data"
+        )
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("File extension can only have up to 10 letters and digits", resp.json["message"])
+        self.objects_count_in_database(ExerciseModel, 0)
+
+    def test_create_exercise_invalid_extensions(self):
+        header = self.create_token_and_header(UserFactory(role=RoleType.trainer))
+
+        for field, extension in (
+            ("tutorial_extension", "x/../../../app.py"),
+            ("video_extension", "../../media_queue"),
+            ("tutorial_extension", "a" * 11),
+        ):
+            data = {**self.VALID_EXERCISE_DATA, field: extension}
+            with patch.object(ExerciseManager, "_stage_media") as mock_stage_media, \
+                    patch.object(ExerciseManager, "_upload_media") as mock_upload_media:
+                resp = self.client.post(self.ENDPOINT, headers=header, json=data)
+
+            self.assertEqual(resp.status_code, 400)
+            self.assertIn(field, resp.json["message"])
+            mock_stage_media.assert_not_called()
+            mock_upload_media.assert_not_called()
+        self.objects_count_in_database(ExerciseModel, 0)
+
+    def test_prepare_uploads_unauthorized(self):
+        header = self.create_token_and_header()
+
+        resp = self.client.post(
+            f"{self.ENDPOINT}/uploads",
+            headers=header,
+            json={"tutorial_extension": "png"}
+        )
+
+        self.assertEqual(resp.status_code, 403)
+
+    def test_prepare_uploads_successfully(self):
+        header = self.create_token_and_header(UserFactory(role=RoleType.trainer))
+
+        resp = self.client.post(
+            f"{self.ENDPOINT}/uploads",
+            headers=header,
+            json={"tutorial_extension": "PNG", "video_extension": "mp4"}
+        )
+
+        self.assertEqual(resp.status_code, 200)
+        photo, video = resp.json["tutorial_photo"], resp.json["video_example"]
+        self.assertRegex(photo["key"], r"^uploads/[0-9a-f]{32}\.png$")
+        self.assertEqual(photo["content_type"], "image/png")
+        self.assertEqual(video["content_type"], "video/mp4")
+        # Signed locally by boto3, nothing is sent to S3 here
+        for upload in (photo, video):
+            self.assertIn(upload["key"], upload["url"])
+            self.assertIn("Signature", upload["url"])
+
+    @patch.object(S3Service, "upload_photo")
+    @patch.object(S3Service, "object_exists", return_value=True)
+    def test_create_exercise_from_uploaded_keys(self, mock_object_exists, mock_s3_upload_photo):
+        header = self.create_token_and_header(UserFactory(role=RoleType.trainer))
+        photo_key = f"uploads/{'a' * 32}.png"
+        video_key = f"uploads/{'b' * 32}.mp4"
+        data = {
+            key: self.VALID_EXERCISE_DATA[key]
+            for key in ("name", "description", "author")
+        }
+
+        resp = self.client.post(
+            self.ENDPOINT,
+            headers=header,
+            json={**data, "tutorial_key": photo_key, "video_key": video_key}
+        )
+
+        self.assertEqual(resp.status_code, 201)
+        self.assertTrue(resp.json["photo_tutorial"].endswith(photo_key))
+        self.assertTrue(resp.json["video"].endswith(video_key))
+        self.assertEqual(
+            [call.args[0] for call in mock_object_exists.call_args_list],
+            [photo_key, video_key]
+        )
+        # The media never goes through the app
+        mock_s3_upload_photo.assert_not_called()
+
+    @patch.object(S3Service, "object_exists", return_value=False)
+    def test_create_exercise_from_missing_upload(self, mock_object_exists):
+        header = self.create_token_and_header(UserFactory(role=RoleType.trainer))
+        data = {
+            key: self.VALID_EXERCISE_DATA[key]
+            for key in ("name", "description", "author")
+        }
+
+        resp = self.client.post(
+            self.ENDPOINT,
+            headers=header,
+            json={**data, "tutorial_key": f"uploads/{'a' * 32}.png"}
+        )
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json, {"message": "Tutorial photo was not uploaded"})
+        self.objects_count_in_database(ExerciseModel, 0)
+
+        # Keys that weren't handed out by the app are rejected
+        resp = self.client.post(
+            self.ENDPOINT,
+            headers=header,
+            json={**data, "tutorial_key": "../other-bucket/photo.png"}
+        )
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("tutorial_key", resp.json["message"])
+        mock_object_exists.assert_called_once()
+
     def test_create_exercises_with_same_names(self):
         user = UserFactory(
             role=RoleType.trainer
@@ -418,6 +1052,442 @@ class TestCreatingExercise(BaseAPITest):
         )
 
 
+class TestBulkCreatingExercises(BaseAPITest):
+    ENDPOINT = "/trainers/exercises"
+
+    def exercise_data(self, name):
+        return {**TestCreatingExercise.VALID_EXERCISE_DATA, "name": name}
+
+    def test_bulk_create_exercises_unauthorized(self):
+        header = self.create_token_and_header()
+
+        resp = self.client.post(
+            self.ENDPOINT,
+            headers=header,
+            json={"exercises": [self.exercise_data("Bench press")]}
+        )
+
+        self.assertEqual(resp.status_code, 403)
+
+    def test_bulk_create_exercises_empty(self):
+        header = self.create_token_and_header(UserFactory(role=RoleType.trainer))
+
+        resp = self.client.post(self.ENDPOINT, headers=header, json={"exercises": []})
+
+        self.assertEqual(resp.status_code, 400)
+
+    @patch.object(S3Service, "upload_photo", return_value="some.s3.url")
+    @patch.object(S3Service, "upload_video", return_value="some.s3_video.url")
+    def test_bulk_create_exercises_successfully(self, mock_s3_upload_video, mock_s3_upload_photo):
+        ExerciseFactory(name="Deadlift")
+        header = self.create_token_and_header(UserFactory(role=RoleType.trainer))
+        exercises = [
+            self.exercise_data("Bench press"),
+            {**self.exercise_data("Squat"), "description": "Too short"},
+            self.exercise_data("Bench press"),
+            self.exercise_data("Deadlift"),
+            {**self.exercise_data("Pull up"), "video_example": "", "video_extension": ""},
+        ]
+
+        resp = self.client.post(self.ENDPOINT, headers=header, json={"exercises": exercises})
+
+        self.assertEqual(resp.status_code, 201)
+        results = resp.json["results"]
+        self.assertEqual(
+            [result["status"] for result in results],
+            ["created", "invalid", "conflict", "conflict", "created"]
+        )
+        self.assertIn("description", results[1]["errors"])
+        self.assertEqual(results[0]["exercise"]["name"], "Bench press")
+        self.assertEqual(results[0]["exercise"]["video"], "some.s3_video.url")
+        self.assertIsNone(results[4]["exercise"]["video"])
+
+        # Only the created exercises were uploaded, and the photo they share just once
+        mock_s3_upload_photo.assert_called_once()
+        mock_s3_upload_video.assert_called_once()
+        self.assertEqual(results[0]["exercise"]["photo_tutorial"], results[4]["exercise"]["photo_tutorial"])
+        self.objects_count_in_database(ExerciseModel, 3)
+
+    @patch.object(S3Service, "upload_photo", return_value="some.s3.url")
+    @patch.object(S3Service, "upload_video", return_value="some.s3_video.url")
+    def test_bulk_create_exercises_with_and_without_photo(self, mock_s3_upload_video, mock_s3_upload_photo):
+        header = self.create_token_and_header(UserFactory(role=RoleType.trainer))
+        exercises = [
+            {**self.exercise_data("Bench press"), "tutorial_photo": ""},
+            self.exercise_data("Squat"),
+            {**self.exercise_data("Deadlift"), "tutorial_extension": ""},
+            self.exercise_data("Pull up"),
+        ]
+
+        resp = self.client.post(self.ENDPOINT, headers=header, json={"exercises": exercises})
+
+        self.assertEqual(resp.status_code, 201)
+        results = resp.json["results"]
+        self.assertEqual(
+            [result["status"] for result in results],
+            ["invalid", "created", "invalid", "created"]
+        )
+        self.assertIn("tutorial_photo", results[0]["errors"])
+        self.assertIn("tutorial_extension", results[2]["errors"])
+        for result in (results[1], results[3]):
+            self.assertEqual(result["exercise"]["photo_tutorial"], "some.s3.url")
+        self.objects_count_in_database(ExerciseModel, 2)
+
+    def test_bulk_create_exercises_rows_share_columns(self):
+        # A row without media still gets every column of the multi-row insert
+        exercises = [
+            {**self.exercise_data("Bench press"), "video_example": "", "video_extension": ""},
+            {**self.exercise_data("Squat"), "tutorial_photo": "", "tutorial_extension": ""},
+        ]
+        with patch.object(CreateExerciseRequest, "validate", return_value={}), \
+                patch.object(S3Service, "upload_photo", return_value="some.s3.url"), \
+                patch.object(S3Service, "upload_video", return_value="some.s3_video.url"):
+            results = ExerciseManager.bulk_create_exercises(exercises)
+
+        self.assertEqual([result["status"] for result in results], ["created", "created"])
+        self.assertEqual(results[0]["exercise"]["photo_tutorial"], "some.s3.url")
+        self.assertIsNone(results[0]["exercise"]["video"])
+        self.assertIsNone(results[1]["exercise"]["photo_tutorial"])
+        self.assertEqual(results[1]["exercise"]["video"], "some.s3_video.url")
+
+
+class TestMediaDeduplication(BaseAPITest):
+    ENDPOINT = "/trainers/exercise"
+
+    def create_exercise(self, name, photo):
+        data = {**TestCreatingExercise.VALID_EXERCISE_DATA, "name": name}
+        data["tutorial_photo"] = base64.b64encode(photo).decode()
+        return self.client.post(
+            self.ENDPOINT,
+            headers=self.create_token_and_header(UserFactory(role=RoleType.trainer)),
+            json=data
+        )
+
+    def media_objects(self):
+        return db.session.execute(
+            db.select(MediaObjectModel.key, MediaObjectModel.ref_count).order_by(MediaObjectModel.key)
+        ).all()
+
+    def test_same_file_is_uploaded_once(self):
+        photo = b"the same demo photo"
+        with patch.object(S3Service, "upload_photo", side_effect=lambda stream, key, ext: f"url/{key}") \
+                as mock_s3_upload_photo, \
+                patch.object(S3Service, "upload_video", side_effect=lambda stream, key, ext: f"url/{key}"):
+            first = self.create_exercise("Bench press", photo)
+            second = self.create_exercise("Incline bench press", photo)
+
+        self.assertEqual((first.status_code, second.status_code), (201, 201))
+        mock_s3_upload_photo.assert_called_once()
+        key = f"media/{hashlib.sha256(photo).hexdigest()}.png"
+        self.assertEqual(first.json["photo_tutorial"], f"url/{key}")
+        self.assertEqual(second.json["photo_tutorial"], f"url/{key}")
+        self.assertIn((key, 2), self.media_objects())
+
+    def test_files_are_counted_after_upload(self):
+        photo = b"the same demo photo"
+        key = f"media/{hashlib.sha256(photo).hexdigest()}.png"
+
+        def upload_photo(stream, upload_key, ext):
+            # Not counted while it uploads, so nothing waits on its row
+            self.assertEqual(self.media_objects(), [])
+            return f"url/{upload_key}"
+
+        with patch.object(S3Service, "upload_photo", side_effect=upload_photo), \
+                patch.object(S3Service, "upload_video", side_effect=lambda stream, key, ext: f"url/{key}"):
+            resp = self.create_exercise("Bench press", photo)
+
+        self.assertEqual(resp.status_code, 201)
+        self.assertIn((key, 1), self.media_objects())
+
+    def test_references_are_counted_in_key_order(self):
+        counted = []
+        execute = db.session.execute
+
+        def record(statement, *args, **kwargs):
+            if getattr(statement, "table", None) is not None and statement.table.name == "media_objects":
+                counted.append(statement.compile().params["key"])
+            return execute(statement, *args, **kwargs)
+
+        with patch.object(db.session, "execute", side_effect=record):
+            acquired = MediaObjectManager.acquire([
+                ("media/b.mp4", "url/b", None),
+                ("media/a.png", "url/a", {"thumbnail": "url/a.thumbnail"}),
+                ("media/b.mp4", "url/b", None),
+            ])
+
+        self.assertEqual(counted, ["media/a.png", "media/b.mp4"])
+        self.assertEqual(acquired["media/a.png"], ("url/a", {"thumbnail": "url/a.thumbnail"}))
+        self.assertEqual(self.media_objects(), [("media/a.png", 1), ("media/b.mp4", 2)])
+
+    def test_failed_upload_counts_nothing(self):
+        header = self.create_token_and_header(UserFactory(role=RoleType.trainer))
+        exercises = [
+            {**TestCreatingExercise.VALID_EXERCISE_DATA, "name": "Bench press"},
+            {**TestCreatingExercise.VALID_EXERCISE_DATA, "name": "Squat", "video_example": "b3RoZXIgdmlkZW8="},
+        ]
+
+        def upload_video(stream, key, ext):
+            if stream.read() == b"other video":
+                raise BadRequest("Unable to upload video")
+            return f"url/{key}"
+
+        with patch.object(S3Service, "upload_photo", side_effect=lambda stream, key, ext: f"url/{key}"), \
+                patch.object(S3Service, "upload_video", side_effect=upload_video):
+            resp = self.client.post("/trainers/exercises", headers=header, json={"exercises": exercises})
+
+        self.assertEqual([result["status"] for result in resp.json["results"]], ["created", "invalid"])
+        # Only the created exercise holds its photo and video
+        self.assertEqual([count for _, count in self.media_objects()], [1, 1])
+
+    def test_object_is_deleted_with_its_last_exercise(self):
+        photo = b"the same demo photo"
+        with patch.object(S3Service, "upload_photo", side_effect=lambda stream, key, ext: f"url/{key}"), \
+                patch.object(S3Service, "upload_video", side_effect=lambda stream, key, ext: f"url/{key}"):
+            first = self.create_exercise("Bench press", photo).json
+            second = self.create_exercise("Incline bench press", photo).json
+        key = f"media/{hashlib.sha256(photo).hexdigest()}.png"
+
+        with patch.object(media_workers, "after_commit") as mock_after_commit:
+            ExerciseManager.delete_exercise(first["pk"])
+            self.assertIn((key, 1), self.media_objects())
+            # The second exercise still uses the photo and the video
+            mock_after_commit.assert_not_called()
+
+            ExerciseManager.delete_exercise(second["pk"])
+
+        # Kept without references until the files are deleted
+        self.assertEqual([count for _, count in self.media_objects()], [0, 0])
+        self.assertEqual(len(mock_after_commit.call_args_list), 2)
+        self.assertIn(key, {call.args[1] for call in mock_after_commit.call_args_list})
+        with patch.object(S3Service, "delete_object") as mock_s3_delete:
+            MediaObjectManager.delete_unreferenced(key)
+        mock_s3_delete.assert_called_once_with(key)
+        self.assertNotIn(key, [key for key, _ in self.media_objects()])
+
+    def test_released_file_is_stored_again(self):
+        photo = b"the same demo photo"
+        key = f"media/{hashlib.sha256(photo).hexdigest()}.png"
+        with patch.object(S3Service, "upload_photo", side_effect=lambda stream, key, ext: f"url/{key}") \
+                as mock_s3_upload_photo, \
+                patch.object(S3Service, "upload_video", side_effect=lambda stream, key, ext: f"url/{key}"):
+            first = self.create_exercise("Bench press", photo).json
+            with patch.object(media_workers, "after_commit"):
+                ExerciseManager.delete_exercise(first["pk"])
+            second = self.create_exercise("Incline bench press", photo)
+
+        # Its files may be deleted already, so the looked up photo is uploaded again
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(len(mock_s3_upload_photo.call_args_list), 2)
+        self.assertIn((key, 1), self.media_objects())
+        with patch.object(S3Service, "delete_object") as mock_s3_delete:
+            MediaObjectManager.delete_unreferenced(key)
+        mock_s3_delete.assert_not_called()
+        self.assertIn((key, 1), self.media_objects())
+
+    @patch.object(S3Service, "object_exists", return_value=True)
+    def test_uploaded_keys_are_deleted_with_their_exercise(self, mock_object_exists):
+        header = self.create_token_and_header(UserFactory(role=RoleType.trainer))
+        photo_key = f"uploads/{'a' * 32}.png"
+        video_key = f"uploads/{'b' * 32}.mp4"
+        data = {
+            key: TestCreatingExercise.VALID_EXERCISE_DATA[key]
+            for key in ("name", "description", "author")
+        }
+        resp = self.client.post(
+            self.ENDPOINT,
+            headers=header,
+            json={**data, "tutorial_key": photo_key, "video_key": video_key}
+        )
+        self.assertEqual(self.media_objects(), [(photo_key, 1), (video_key, 1)])
+
+        with patch.object(media_workers, "after_commit") as mock_after_commit:
+            ExerciseManager.delete_exercise(resp.json["pk"])
+
+        self.assertEqual(self.media_objects(), [(photo_key, 0), (video_key, 0)])
+        self.assertEqual(
+            sorted(call.args[1] for call in mock_after_commit.call_args_list),
+            [photo_key, video_key]
+        )
+
+
+class TestMediaUploadQueue(BaseAPITest):
+    ENDPOINT = "/trainers/exercise"
+
+    def setUp(self):
+        super().setUp()
+        self.app.config["MEDIA_UPLOADS_INLINE"] = False
+        started = patch.object(BackgroundWorkers, "started", new_callable=PropertyMock, return_value=True)
+        started.start()
+        self.addCleanup(started.stop)
+        self.addCleanup(self.app.config.update, MEDIA_UPLOADS_INLINE=True)
+
+    def queue_exercise(self):
+        header = self.create_token_and_header(UserFactory(role=RoleType.trainer))
+        with patch.object(S3Service, "upload_photo") as mock_s3_upload_photo, \
+                patch.object(S3Service, "upload_video") as mock_s3_upload_video:
+            resp = self.client.post(
+                self.ENDPOINT,
+                headers=header,
+                json=TestCreatingExercise.VALID_EXERCISE_DATA
+            )
+        mock_s3_upload_photo.assert_not_called()
+        mock_s3_upload_video.assert_not_called()
+        return resp
+
+    def jobs(self):
+        return db.session.execute(
+            db.select(MediaJobModel).order_by(MediaJobModel.pk)
+        ).scalars().all()
+
+    def test_create_exercise_queues_uploads(self):
+        resp = self.queue_exercise()
+
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.json["media_status"], "pending")
+        self.assertIsNone(resp.json["photo_tutorial"])
+        self.assertIsNone(resp.json["video"])
+
+        photo, video = self.jobs()
+        self.assertEqual((photo.media_type, video.media_type), (MediaType.photo, MediaType.video))
+        self.assertEqual({photo.status, video.status}, {JobStatus.pending})
+        with open(os.path.join(MEDIA_QUEUE_FOLDER, photo.key), "rb") as staged:
+            self.assertEqual(staged.read(), base64.b64decode("some_photo_url"))
+
+        # Handed to the workers only once the request's transaction commits
+        queued = db.session.info["background_after_commit"]
+        self.assertEqual([args for _, _, args in queued], [(photo.pk, photo.key), (video.pk, video.key)])
+
+        # A transaction that doesn't commit leaves no staged files behind
+        paths = [os.path.join(MEDIA_QUEUE_FOLDER, job.key) for job in (photo, video)]
+        db.session.close()
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+    def test_process_media_jobs(self):
+        self.queue_exercise()
+        photo, video = self.jobs()
+        exercise = db.session.get(ExerciseModel, photo.exercise_pk)
+
+        with patch.object(S3Service, "upload_photo", return_value="some.s3.url") as mock_s3_upload_photo:
+            ExerciseManager.process_media_job(photo)
+
+        mock_s3_upload_photo.assert_called_once()
+        self.assertEqual(photo.status, JobStatus.done)
+        self.assertEqual(exercise.photo_tutorial, "some.s3.url")
+        # Still waiting for the video
+        self.assertEqual(exercise.media_status, MediaStatus.pending)
+
+        with patch.object(S3Service, "upload_video", return_value="some.s3_video.url"):
+            ExerciseManager.process_media_job(video)
+
+        self.assertEqual(exercise.video, "some.s3_video.url")
+        self.assertEqual(exercise.media_status, MediaStatus.ready)
+
+    def test_failed_media_job(self):
+        self.queue_exercise()
+        photo, _ = self.jobs()
+        exercise = db.session.get(ExerciseModel, photo.exercise_pk)
+
+        with patch.object(S3Service, "upload_photo", side_effect=BadRequest("Unable to upload photo")):
+            with self.assertRaises(BadRequest):
+                ExerciseManager.process_media_job(photo)
+
+        # Retried until the attempts run out
+        photo.attempts = 1
+        ExerciseManager._media_job_failed(photo, "Unable to upload photo")
+        self.assertEqual(photo.status, JobStatus.pending)
+        self.assertEqual(exercise.media_status, MediaStatus.pending)
+
+        photo.attempts = MEDIA_JOB_MAX_ATTEMPTS
+        ExerciseManager._media_job_failed(photo, "Unable to upload photo")
+        self.assertEqual(photo.status, JobStatus.failed)
+        self.assertEqual(photo.error, "Unable to upload photo")
+        self.assertEqual(exercise.media_status, MediaStatus.failed)
+
+    def test_resume_media_jobs(self):
+        self.queue_exercise()
+        photo, video = self.jobs()
+        photo.updated_at = datetime.now(timezone.utc) - timedelta(seconds=MEDIA_JOB_RETRY_SECONDS + 1)
+        db.session.flush()
+
+        with patch.object(media_workers, "submit") as mock_submit:
+            resumed = ExerciseManager.resume_media_jobs()
+
+        # The video job was only just queued
+        self.assertEqual(resumed, 1)
+        mock_submit.assert_called_once_with(ExerciseManager.run_media_job, photo.pk)
+
+    def test_invalid_media_leaves_no_staged_file(self):
+        os.makedirs(MEDIA_QUEUE_FOLDER, exist_ok=True)
+        staged = set(os.listdir(MEDIA_QUEUE_FOLDER))
+        header = self.create_token_and_header(UserFactory(role=RoleType.trainer))
+
+        resp = self.client.post(
+            self.ENDPOINT,
+            headers=header,
+            json={**TestCreatingExercise.VALID_EXERCISE_DATA, "video_example": "not base64!"}
+        )
+
+        self.assertEqual(resp.status_code, 400)
+        # The photo was staged before the video failed to decode
+        self.assertEqual(set(os.listdir(MEDIA_QUEUE_FOLDER)), staged)
+
+    def test_media_job_of_deleted_exercise(self):
+        self.queue_exercise()
+        photo, _ = self.jobs()
+        photo_pk, photo_key = photo.pk, photo.key
+        # Run by hand below instead of on the workers
+        db.session.info.pop("background_after_commit")
+        # The delete cascades to the jobs
+        db.session.execute(db.delete(MediaJobModel))
+        db.session.execute(db.delete(ExerciseModel))
+        db.session.commit()
+
+        with patch.object(S3Service, "upload_photo") as mock_s3_upload_photo:
+            ExerciseManager.run_media_job(photo_pk, photo_key)
+
+        mock_s3_upload_photo.assert_not_called()
+        self.assertFalse(os.path.exists(os.path.join(MEDIA_QUEUE_FOLDER, photo_key)))
+
+    def test_exercise_deleted_while_uploading(self):
+        self.queue_exercise()
+        photo, _ = self.jobs()
+        photo_pk, path = photo.pk, os.path.join(MEDIA_QUEUE_FOLDER, photo.key)
+        db.session.info.pop("background_after_commit")
+        db.session.commit()
+
+        def upload_photo(stream, key, ext):
+            # Deleted by another request, this session doesn't see it
+            for model in (MediaJobModel, ExerciseModel):
+                db.session.execute(db.delete(model).execution_options(synchronize_session=False))
+            return "some.s3.url"
+
+        with patch.object(S3Service, "upload_photo", side_effect=upload_photo):
+            ExerciseManager.run_media_job(photo_pk)
+
+        self.assertEqual(self.jobs(), [])
+        self.assertFalse(os.path.exists(path))
+
+    def test_sweep_media_queue(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        with patch("managers.exercise.MEDIA_QUEUE_FOLDER", folder.name):
+            self.queue_exercise()
+            photo, video = self.jobs()
+            orphan, recent = (os.path.join(folder.name, f"{uuid.uuid4()}.png") for _ in range(2))
+            for path in (orphan, recent):
+                with open(path, "wb") as staged:
+                    staged.write(b"left behind")
+            old = time.time() - MEDIA_JOB_TIMEOUT - 1
+            for path in (orphan, os.path.join(folder.name, photo.key)):
+                os.utime(path, (old, old))
+
+            removed = ExerciseManager.sweep_media_queue()
+
+        self.assertEqual(removed, 1)
+        # Still waiting to upload, or possibly not committed yet
+        self.assertEqual(sorted(os.listdir(folder.name)), sorted([photo.key, video.key, os.path.basename(recent)]))
+
+
 class TestDeleteExercise(BaseAPITest):
     ENDPOINT = "/admin/delete/exercise/1"
 
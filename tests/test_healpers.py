@@ -0,0 +1,91 @@
+import base64
+import hashlib
+import io
+import os
+import tempfile
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import BadRequest
+
+from utils import healpers, temp_files
+from utils.healpers import decode_base64_to, decode_photo, decode_video, open_media
+from utils.temp_files import sweep_temp_files
+
+
+class TestStreamingBase64Decoder(TestCase):
+    ENCODED = [
+        base64.b64encode(os.urandom(1000)).decode(),
+        base64.encodebytes(os.urandom(1000)).decode(),
+        "some_photo_url",
+        "QUJDRA==",
+        "QUJDRA==trailing",
+        "",
+    ]
+
+    def test_same_result_as_b64decode(self):
+        # Small windows put quanta, line breaks and padding on window edges
+        for window_size in (4, 8, 76, 1024 * 1024):
+            with patch.object(healpers, "DECODE_WINDOW_SIZE", window_size):
+                for encoded in self.ENCODED:
+                    stream = io.BytesIO()
+                    decode_base64_to(stream, encoded)
+                    self.assertEqual(
+                        stream.getvalue(),
+                        base64.b64decode(encoded.encode("utf-8"))
+                    )
+
+    def test_invalid_encoding(self):
+        stream = io.BytesIO()
+
+        with patch.object(healpers, "DECODE_WINDOW_SIZE", 4):
+            with self.assertRaises(BadRequest):
+                decode_photo(stream, "QUJDRA" * 10 + "Q")
+
+    def test_open_media_spills_to_worker_folder(self):
+        payload = os.urandom(64)
+        with tempfile.TemporaryDirectory() as folder:
+            with patch.object(temp_files, "TEMP_FILE_FOLDER", folder), \
+                    patch.object(temp_files, "UPLOAD_SPOOL_SIZE", 16):
+                with open_media(base64.b64encode(payload).decode(), decode_video) as (stream, digest):
+                    self.assertTrue(stream._rolled)
+                    self.assertEqual(stream.read(), payload)
+                    self.assertEqual(digest, hashlib.sha256(payload).hexdigest())
+
+                # Spilled files don't outlive the upload
+                self.assertEqual(os.listdir(os.path.join(folder, f"worker-{os.getpid()}")), [])
+
+    def test_open_media_hashes_file_parts(self):
+        payload = os.urandom(64)
+        upload = FileStorage(io.BytesIO(payload), "photo.png")
+        with open_media(upload, decode_photo) as (stream, digest):
+            self.assertEqual(stream.read(), payload)
+            self.assertEqual(digest, hashlib.sha256(payload).hexdigest())
+
+
+class TestTempFileJanitor(TestCase):
+    def test_sweep_temp_files(self):
+        with tempfile.TemporaryDirectory() as folder:
+            old = os.path.join(folder, "orphan.mp4")
+            new = os.path.join(folder, "in-progress.png")
+            # No process has this pid, it's above the default pid_max
+            dead_worker = os.path.join(folder, "worker-99999999")
+            own_worker = os.path.join(folder, f"worker-{os.getpid()}")
+            for path in (dead_worker, own_worker):
+                os.makedirs(path)
+            for path in (old, new, os.path.join(dead_worker, "a.png"), os.path.join(own_worker, "b.png")):
+                with open(path, "wb") as f:
+                    f.write(b"data")
+            os.utime(old, (time.time() - 7200, time.time() - 7200))
+
+            with patch.object(temp_files, "TEMP_FILE_FOLDER", folder):
+                removed = sweep_temp_files(max_age=3600)
+
+            self.assertEqual(removed, 2)
+            self.assertEqual(
+                sorted(os.listdir(folder)),
+                sorted(["in-progress.png", f"worker-{os.getpid()}"])
+            )
+            self.assertEqual(os.listdir(own_worker), ["b.png"])
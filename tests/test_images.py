@@ -0,0 +1,70 @@
+import io
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest import TestCase
+from unittest.mock import patch
+
+from PIL import Image
+
+from utils import images
+from utils.images import make_variants, start_variants, variant_key, variants_result
+from utils.pools import worker_pool
+
+
+class TestImageVariants(TestCase):
+    def encode(self, image, image_format="PNG"):
+        buffer = io.BytesIO()
+        image.save(buffer, image_format)
+        return buffer.getvalue()
+
+    def test_variants_fit_their_size(self):
+        data = self.encode(Image.new("RGB", (900, 1800), "blue"))
+
+        variants = make_variants(data, {"thumbnail": 100, "detail": 3000})
+
+        with Image.open(io.BytesIO(variants["thumbnail"])) as thumbnail:
+            self.assertEqual((thumbnail.format, thumbnail.size), ("WEBP", (50, 100)))
+        # Never upscaled
+        with Image.open(io.BytesIO(variants["detail"])) as detail:
+            self.assertEqual(detail.size, (900, 1800))
+
+    def test_transparency_is_kept(self):
+        data = self.encode(Image.new("LA", (400, 400), (0, 0)))
+
+        variants = make_variants(data, {"thumbnail": 100})
+
+        with Image.open(io.BytesIO(variants["thumbnail"])) as thumbnail:
+            self.assertEqual(thumbnail.mode, "RGBA")
+
+    def test_runs_on_the_pool(self):
+        stream = io.BytesIO(self.encode(Image.new("RGB", (640, 320))))
+
+        variants = variants_result(start_variants(stream))
+
+        self.assertEqual(set(variants), {"thumbnail", "list", "detail"})
+        self.assertEqual(stream.tell(), 0)
+        self.assertEqual(variants_result(start_variants(io.BytesIO(b"not an image"))), {})
+
+    def test_big_photo_is_not_read(self):
+        stream = io.BytesIO(self.encode(Image.new("RGB", (640, 320))))
+
+        with patch.object(images, "IMAGE_VARIANT_MAX_SIZE", 100), \
+                patch.object(images, "_executor") as mock_executor:
+            variants = variants_result(start_variants(stream))
+
+        self.assertEqual(variants, {})
+        self.assertEqual(stream.tell(), 0)
+        mock_executor.assert_not_called()
+
+    def test_worker_pool(self):
+        pool = worker_pool(1)
+        self.addCleanup(pool.shutdown)
+        self.assertIsInstance(pool, ProcessPoolExecutor)
+
+        # Where the workers would be spawned, threads take their place
+        with patch("multiprocessing.get_all_start_methods", return_value=["spawn"]):
+            pool = worker_pool(1)
+        self.addCleanup(pool.shutdown)
+        self.assertIsInstance(pool, ThreadPoolExecutor)
+
+    def test_variant_key(self):
+        self.assertEqual(variant_key("media/abc.png", "list"), "media/abc.list.webp")
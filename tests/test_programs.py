@@ -305,6 +305,20 @@ class GetPrograms(BaseAPITest):
             self.GET_SPECIFIC_ENDPOINT
         )
 
+    def test_get_programs_not_modified(self):
+        ProgramFactory()
+        header = self.create_token_and_header()
+
+        resp = self.client.get(self.GET_ALL_ENDPOINT, headers=header)
+        etag = resp.headers["ETag"]
+
+        resp = self.client.get(
+            self.GET_ALL_ENDPOINT,
+            headers={**header, "If-None-Match": etag}
+        )
+
+        self.assertEqual(resp.status_code, 304)
+
 
 class TestDeletePrograms(BaseAPITest):
     ENDPOINT = "admin/delete/program/1"
@@ -0,0 +1,97 @@
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import TestCase
+
+from marshmallow import fields, Schema, post_dump
+
+from models import ExerciseModel, ProgramModel
+from schemas.compiler import compile_schema
+from schemas.response.exercise import (
+    ExerciseUserResponseSchema,
+    ExerciseSuperUserResponseSchema,
+    ExerciseProgramResponse,
+    exercise_user_serializer,
+    exercise_super_user_serializer,
+)
+from schemas.response.program import ProgramResponseSchema, program_serializer
+
+
+class TestCompiledSerializers(TestCase):
+    def assert_parity(self, schema, serializer, obj, many=False):
+        expected = schema().dump(obj, many=many)
+        result = serializer.dump(obj, many=many)
+        self.assertEqual(result, expected)
+        # Key order is part of the response body
+        if many:
+            self.assertEqual([list(item) for item in result], [list(item) for item in expected])
+        else:
+            self.assertEqual(list(result), list(expected))
+
+    def exercises(self):
+        return [
+            ExerciseModel(pk=1, name="Bench press", description="Chest exercise",
+                          photo_tutorial="https://bucket/photo.jpg", video="https://bucket/video.mp4"),
+            ExerciseModel(pk=2, name="Squat", description="Leg exercise",
+                          photo_tutorial=None, video=None),
+            SimpleNamespace(pk="3", name="Deadlift", description=b"Back exercise"),
+            SimpleNamespace(pk=4, name=5),
+        ]
+
+    def test_exercise_schemas_match_marshmallow(self):
+        for schema, serializer in (
+            (ExerciseUserResponseSchema, exercise_user_serializer),
+            (ExerciseSuperUserResponseSchema, exercise_super_user_serializer),
+        ):
+            self.assert_parity(schema, serializer, self.exercises(), many=True)
+            for exercise in self.exercises():
+                self.assert_parity(schema, serializer, exercise)
+
+    def test_dicts_match_marshmallow(self):
+        exercise = {"pk": 1, "name": "Bench press", "description": "Chest exercise"}
+        self.assert_parity(ExerciseUserResponseSchema, exercise_user_serializer, exercise)
+
+    def test_program_schema_matches_marshmallow(self):
+        exercises = self.exercises()
+        programs = [
+            ProgramModel(pk=1, title="Full body", exercises=exercises[:2]),
+            ProgramModel(pk=2, title="Empty", exercises=[]),
+            SimpleNamespace(pk=3, title="Rows", exercises=[SimpleNamespace(pk=7, name="Row")]),
+            SimpleNamespace(pk=4, title="No exercises", exercises=None),
+            SimpleNamespace(pk=5),
+        ]
+
+        self.assert_parity(ProgramResponseSchema, program_serializer, programs, many=True)
+        for program in programs:
+            self.assert_parity(ProgramResponseSchema, program_serializer, program)
+
+    def test_unsupported_fields_fall_back_to_marshmallow(self):
+        class CustomSchema(Schema):
+            pk = fields.Integer(as_string=True)
+            name = fields.String(data_key="title", dump_default="unnamed")
+            upper = fields.Method("get_upper")
+            created = fields.DateTime(attribute="created_at")
+            exercise = fields.Nested(ExerciseProgramResponse, only=("pk",))
+
+            def get_upper(self, obj):
+                return obj.description.upper()
+
+        obj = SimpleNamespace(
+            pk=1,
+            description="Chest exercise",
+            created_at=datetime(2024, 5, 1, 12, 30),
+            exercise=SimpleNamespace(pk=2, name="Squat"),
+        )
+        self.assert_parity(CustomSchema, compile_schema(CustomSchema), obj)
+
+    def test_schemas_with_dump_hooks_are_not_compiled(self):
+        class EnvelopeSchema(ExerciseProgramResponse):
+            @post_dump(pass_many=True)
+            def envelope(self, data, many, **kwargs):
+                return {"exercises": data}
+
+        exercises = [SimpleNamespace(pk=1, name="Squat")]
+        self.assert_parity(EnvelopeSchema, compile_schema(EnvelopeSchema), exercises[0])
+        self.assertEqual(
+            compile_schema(EnvelopeSchema).dump(exercises, many=True),
+            {"exercises": [{"pk": 1, "name": "Squat"}]}
+        )
@@ -0,0 +1,185 @@
+import io
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from werkzeug.exceptions import BadRequest
+
+from constants import ROOT_DIR
+from managers.media import storage
+from services.s3 import S3Service
+from services.storage import LazyStorage, LocalStorage
+from tests.base import BaseAPITest
+
+
+class TestLocalStorage(TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.storage = LocalStorage(folder.name, "http://localhost:5000/media/")
+
+    def test_upload_and_delete(self):
+        url = self.storage.upload_photo(io.BytesIO(b"photo bytes"), "media/abc.png", "png")
+
+        self.assertEqual(url, "http://localhost:5000/media/media/abc.png")
+        self.assertTrue(self.storage.object_exists("media/abc.png"))
+        with open(self.storage.path("media/abc.png"), "rb") as stored:
+            self.assertEqual(stored.read(), b"photo bytes")
+
+        self.storage.delete_object("media/abc.png")
+        self.assertFalse(self.storage.object_exists("media/abc.png"))
+        # Already gone is fine
+        self.storage.delete_object("media/abc.png")
+
+    def test_failed_upload_keeps_the_old_file(self):
+        self.storage.upload_video(io.BytesIO(b"old video"), "media/abc.mp4", "mp4")
+
+        class Broken(io.BytesIO):
+            def read(self, *args):
+                raise OSError("connection reset")
+
+        with self.assertRaises(BadRequest):
+            self.storage.upload_video(Broken(), "media/abc.mp4", "mp4")
+
+        with open(self.storage.path("media/abc.mp4"), "rb") as stored:
+            self.assertEqual(stored.read(), b"old video")
+        # No temporary file is left behind either
+        self.assertEqual(os.listdir(os.path.dirname(self.storage.path("media/abc.mp4"))), ["abc.mp4"])
+
+    def test_keys_stay_in_the_folder(self):
+        with self.assertRaises(BadRequest):
+            self.storage.upload_photo(io.BytesIO(b"photo bytes"), "../outside.png", "png")
+        self.assertFalse(self.storage.object_exists("../outside.png"))
+
+    def test_no_presigned_uploads(self):
+        with self.assertRaises(BadRequest):
+            self.storage.presigned_upload("uploads/abc.png", "image/png")
+
+    def test_relative_folder_is_under_the_project_root(self):
+        with patch.dict(os.environ, {"LOCAL_STORAGE_FOLDER": "media_files"}):
+            storage = LocalStorage()
+
+        # Wherever the app was started from
+        self.assertEqual(storage.folder, os.path.join(ROOT_DIR, "media_files"))
+        self.assertEqual(LocalStorage(self.storage.folder).folder, self.storage.folder)
+
+
+class TestLazyStorage(TestCase):
+    def test_backend_is_built_on_first_use(self):
+        lazy = LazyStorage()
+        self.assertIsNone(lazy._backend)
+
+        with patch.dict(os.environ, {"STORAGE_BACKEND": "local"}):
+            self.assertIsInstance(lazy.backend, LocalStorage)
+        self.assertEqual(lazy.object_url("a.png"), lazy.backend.object_url("a.png"))
+
+    def test_s3_by_default(self):
+        self.assertIsInstance(LazyStorage().backend, S3Service)
+
+    def test_unknown_backend(self):
+        with patch.dict(os.environ, {"STORAGE_BACKEND": "ftp"}):
+            with self.assertRaises(ValueError):
+                LazyStorage().backend
+
+
+class TestServingLocalMedia(BaseAPITest):
+    def setUp(self):
+        super().setUp()
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.local = LocalStorage(folder.name, "http://localhost/media")
+
+    def test_serve_local_file(self):
+        self.local.upload_photo(io.BytesIO(b"photo bytes"), "media/abc.png", "png")
+
+        with patch.object(storage, "_backend", self.local):
+            resp = self.client.get("/media/media/abc.png")
+            missing = self.client.get("/media/media/missing.png")
+            outside = self.client.get("/media/../config.py")
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data, b"photo bytes")
+        self.assertEqual(resp.mimetype, "image/png")
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(outside.status_code, 404)
+        resp.close()
+
+    def serve(self, key, headers=None, **environ):
+        with patch.object(storage, "_backend", self.local):
+            return self.client.get(f"/media/{key}", headers=headers, environ_overrides=environ)
+
+    def test_range_requests(self):
+        key = f"media/{'a' * 64}.mp4"
+        self.local.upload_video(io.BytesIO(bytes(range(256)) * 40), key, "mp4")
+
+        resp = self.serve(key, {"Range": "bytes=100-199"})
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp.headers["Content-Range"], "bytes 100-199/10240")
+        self.assertEqual(resp.data, (bytes(range(256)) * 40)[100:200])
+        resp.close()
+
+        resp = self.serve(key, {"Range": "bytes=-16"})
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp.data, (bytes(range(256)) * 40)[-16:])
+        resp.close()
+
+        resp = self.serve(key, {"Range": "bytes=20000-"})
+        self.assertEqual(resp.status_code, 416)
+
+    def test_streamed_with_the_file_wrapper(self):
+        wrapped = []
+
+        def file_wrapper(file, block_size=8192):
+            wrapped.append(file)
+            return iter(lambda: file.read(block_size), b"")
+
+        key = f"media/{'b' * 64}.mp4"
+        self.local.upload_video(io.BytesIO(b"video bytes"), key, "mp4")
+
+        resp = self.serve(key, **{"wsgi.file_wrapper": file_wrapper})
+
+        self.assertEqual(resp.data, b"video bytes")
+        self.assertEqual(wrapped[0].name, self.local.path(key))
+        resp.close()
+
+    def test_content_addressed_media_is_cached_for_good(self):
+        key = f"media/{'c' * 64}.thumbnail.webp"
+        self.local.upload_photo(io.BytesIO(b"thumbnail"), key, "webp")
+
+        resp = self.serve(key)
+        resp.close()
+
+        self.assertEqual(resp.headers["ETag"], f'"{"c" * 64}.thumbnail.webp"')
+        self.assertIn("immutable", resp.headers["Cache-Control"])
+        self.assertIn("max-age=31536000", resp.headers["Cache-Control"])
+        self.assertIn("Last-Modified", resp.headers)
+
+        repeat = self.serve(key, {"If-None-Match": resp.headers["ETag"]})
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat.data, b"")
+
+    def test_other_media_is_revalidated(self):
+        self.local.upload_photo(io.BytesIO(b"photo bytes"), "legacy.png", "png")
+
+        resp = self.serve("legacy.png")
+        resp.close()
+
+        self.assertIn("no-cache", resp.headers["Cache-Control"])
+        for headers in (
+            {"If-None-Match": resp.headers["ETag"]},
+            {"If-Modified-Since": resp.headers["Last-Modified"]},
+        ):
+            self.assertEqual(self.serve("legacy.png", headers).status_code, 304)
+
+        # A changed file no longer matches
+        os.utime(self.local.path("legacy.png"), (1, 1))
+        resp = self.serve("legacy.png", {"If-None-Match": resp.headers["ETag"]})
+        self.assertEqual(resp.status_code, 200)
+        resp.close()
+
+    def test_not_served_with_s3(self):
+        with patch.object(storage, "_backend", S3Service()):
+            resp = self.client.get("/media/media/abc.png")
+
+        self.assertEqual(resp.status_code, 404)
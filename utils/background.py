@@ -0,0 +1,92 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from sqlalchemy import event
+
+from db import db
+
+"""
+    Work that runs outside the request, on a thread pool of this
+    worker process. Calls made with after_commit wait for the current
+    transaction, so a job never starts before its rows are visible,
+    and a rolled back transaction drops them and runs the on_rollback calls.
+    on_commit calls run right away in the committing thread instead
+"""
+
+_AFTER_COMMIT = "background_after_commit"
+_ON_COMMIT = "background_on_commit"
+_ON_ROLLBACK = "background_on_rollback"
+
+
+class BackgroundWorkers:
+    def __init__(self, max_workers, thread_name_prefix):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._app = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def start(self, app):
+        with self._lock:
+            self._app = app
+            # A forked worker doesn't get the parent's threads
+            if self._executor is None or self._executor[0] != os.getpid():
+                executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix=self.thread_name_prefix
+                )
+                self._executor = (os.getpid(), executor)
+
+    @property
+    def started(self):
+        return self._executor is not None and self._executor[0] == os.getpid()
+
+    @staticmethod
+    def _run(app, function, args):
+        with app.app_context():
+            try:
+                function(*args)
+            except Exception:
+                app.logger.exception("Background job %s failed", function.__qualname__)
+
+    def submit(self, function, *args):
+        if not self.started:
+            # No pool in this process, e.g. with inline uploads, so a thread of its own
+            thread = threading.Thread(
+                target=self._run, args=(current_app._get_current_object(), function, args), daemon=True
+            )
+            thread.start()
+            return thread
+        return self._executor[1].submit(self._run, self._app, function, args)
+
+    def after_commit(self, function, *args):
+        db.session.info.setdefault(_AFTER_COMMIT, []).append((self, function, args))
+
+    @staticmethod
+    def on_rollback(function, *args):
+        db.session.info.setdefault(_ON_ROLLBACK, []).append((function, args))
+
+
+def on_commit(function, *args):
+    db.session.info.setdefault(_ON_COMMIT, []).append((function, args))
+
+
+@event.listens_for(db.session, "after_commit")
+def _submit_committed(session):
+    session.info.pop(_ON_ROLLBACK, None)
+    for function, args in session.info.pop(_ON_COMMIT, ()):
+        function(*args)
+    for workers, function, args in session.info.pop(_AFTER_COMMIT, ()):
+        workers.submit(function, *args)
+
+
+@event.listens_for(db.session, "after_transaction_end")
+def _drop_rolled_back(session, transaction):
+    # Also runs after a commit, by then both lists are already gone
+    if transaction.parent is not None:
+        return
+    session.info.pop(_AFTER_COMMIT, None)
+    session.info.pop(_ON_COMMIT, None)
+    for function, args in session.info.pop(_ON_ROLLBACK, ()):
+        function(*args)
@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import OrderedDict
+
+"""
+    Every in-process cache registers itself here,
+    so the tests can start each case from a clean state
+"""
+
+_registry = []
+
+
+def register_cache(cache):
+    _registry.append(cache)
+    return cache
+
+
+def clear_caches():
+    for cache in _registry:
+        cache.clear()
+
+
+class Refreshed:
+    """
+        A value built by build() and rebuilt once it's older than
+        refresh_seconds. Only the first build makes readers wait, while
+        one request rebuilds it the rest keep using the old value
+    """
+
+    def __init__(self, build, refresh_seconds):
+        self.build = build
+        self.refresh_seconds = refresh_seconds
+        self.value = None
+        self._built_at = 0
+        self._lock = threading.Lock()
+
+    def _stale(self):
+        return self.value is None or time.monotonic() - self._built_at >= self.refresh_seconds
+
+    def get(self):
+        value = self.value
+        if not self._stale():
+            return value
+
+        if not self._lock.acquire(blocking=value is None):
+            return value
+        try:
+            if self._stale():
+                self.value = self.build()
+                self._built_at = time.monotonic()
+            return self.value
+        finally:
+            self._lock.release()
+
+    def update(self, function):
+        # Changes the current value in place, a value not built yet is left alone
+        with self._lock:
+            if self.value is not None:
+                function(self.value)
+
+    def reset(self):
+        with self._lock:
+            self.value = None
+
+
+class TTLCache:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        register_cache(self)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, expires_at=None):
+        # The entry never outlives the given deadline, e.g. the token "exp"
+        deadline = time.time() + self.ttl
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+
+        with self._lock:
+            self._entries[key] = (deadline, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard_where(self, predicate):
+        with self._lock:
+            stale = [key for key, (_, value) in self._entries.items() if predicate(value)]
+            for key in stale:
+                del self._entries[key]
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "max_size": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class SnapshotCache:
+    """
+        Encoded response bodies, each valid for the data version it was
+        built from. Concurrent misses on one key wait for a single build
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._building = {}
+        self._lock = threading.Lock()
+        register_cache(self)
+
+    def _lookup(self, key, version):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def get_or_build(self, key, version, build):
+        with self._lock:
+            body = self._lookup(key, version)
+            if body is not None:
+                return body
+            key_lock = self._building.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                # Someone else may have built it while this request waited
+                body = self._lookup(key, version)
+                if body is not None:
+                    return body
+                self.misses += 1
+
+            body = build()
+
+            with self._lock:
+                self._entries[key] = (version, body)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._building.pop(evicted, None)
+            return body
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._building.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "max_size": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -1,10 +1,13 @@
-from flask import request
+from flask import request, Response, g
+from flask_restful.utils import unpack
 from marshmallow import Schema
-from werkzeug.exceptions import Forbidden, BadRequest
+from werkzeug.exceptions import Forbidden, BadRequest, TooManyRequests
 
-from managers.auth import auth
+from managers.auth import auth, client_login_limiter, email_login_limiter
+from managers.version import VersionManager
 from models import RoleType
 from models.user import UserModel
+from utils.healpers import request_data
 
 
 def permission_required(required_roles: list[RoleType]):
@@ -21,11 +24,26 @@ def permission_required(required_roles: list[RoleType]):
 
 
 def schema_validator(schema_name):
+    # schema_name can also be a function picking the schema for the current request
+    def decorator(function):
+        def wrapper(*args, **kwargs):
+            schema_class = schema_name if isinstance(schema_name, type) else schema_name()
+            schema: Schema = schema_class()
+            errors = schema.validate(request_data())
+            if errors:
+                raise BadRequest(f"Invalid fields {errors}")
+            return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def query_validator(schema_name):
     def decorator(function):
         def wrapper(*args, **kwargs):
-            data = request.get_json()
             schema: Schema = schema_name()
-            errors = schema.validate(data)
+            errors = schema.validate(request.args)
             if errors:
                 raise BadRequest(f"Invalid fields {errors}")
             return function(*args, **kwargs)
@@ -33,3 +51,51 @@ def schema_validator(schema_name):
         return wrapper
 
     return decorator
+
+
+def conditional_get(table_names):
+    """
+        Strong ETag from the path, the caller's role and the versions
+        of the given tables. A matching If-None-Match gets a 304 before
+        the resource touches the ORM or the response schemas
+    """
+
+    def decorator(function):
+        def wrapper(*args, **kwargs):
+            user: UserModel = auth.current_user()
+            # Kept for the resource, e.g. as the version of its cached snapshot
+            g.table_versions = VersionManager.get_versions(*table_names)
+            etag = VersionManager.etag(g.table_versions, request.full_path, user.role.name)
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+
+            result = function(*args, **kwargs)
+            if isinstance(result, Response):
+                result.set_etag(etag)
+                return result
+
+            data, code, headers = unpack(result)
+            return data, code, {**(headers or {}), "ETag": f'"{etag}"'}
+
+        return wrapper
+
+    return decorator
+
+
+def login_rate_limited(function):
+    def wrapper(*args, **kwargs):
+        email = request.get_json()["email"].lower()
+        for limiter, key in (
+                (client_login_limiter, request.remote_addr),
+                (email_login_limiter, email)
+        ):
+            if not limiter.allow(key):
+                raise TooManyRequests(
+                    "Too many login attempts, please try again later",
+                    retry_after=limiter.retry_after
+                )
+        return function(*args, **kwargs)
+
+    return wrapper
@@ -1,19 +1,118 @@
-import base64
+import binascii
+import hashlib
+import string
+from contextlib import contextmanager
 
+from decouple import config
+from flask import request
+from werkzeug.datastructures import FileStorage
 from werkzeug.exceptions import BadRequest
 
+from utils.temp_files import spooled_file
 
-def decode_photo(path, encoded_str):
-    with open(path, "wb") as f:
-        try:
-            f.write(base64.b64decode(encoded_str.encode("utf-8")))
-        except Exception as ex:
-            raise BadRequest("Invalid photo encoding")
 
+# Multiple of 4, so every window holds whole base64 quanta
+DECODE_WINDOW_SIZE = config("DECODE_WINDOW_SIZE", default=256 * 1024, cast=int) // 4 * 4
 
-def decode_video(path, encoded_str):
-    with open(path, "wb") as f:
-        try:
-            f.write(base64.b64decode(encoded_str.encode("utf-8")))
-        except Exception as ex:
-            raise BadRequest("Invalid video encoding")
+# Like b64decode, characters outside the alphabet are skipped
+_NOT_BASE64 = bytes(
+    set(range(256)) - set((string.ascii_letters + string.digits + "+/=").encode("ascii"))
+)
+
+
+def decode_base64_to(stream, encoded_str):
+    """
+        Decodes window by window straight into stream, so neither the
+        encoded bytes nor the decoded payload are held in memory whole.
+        Raises ValueError at the first window that doesn't decode
+    """
+    leftover = b""
+    for start in range(0, len(encoded_str), DECODE_WINDOW_SIZE):
+        window = encoded_str[start:start + DECODE_WINDOW_SIZE].encode("utf-8")
+        window = leftover + window.translate(None, _NOT_BASE64)
+        if b"=" in window:
+            # Padding ends the data, whatever follows is decoded the way b64decode does
+            rest = encoded_str[start + DECODE_WINDOW_SIZE:].encode("utf-8")
+            stream.write(binascii.a2b_base64(window + rest.translate(None, _NOT_BASE64)))
+            return
+
+        aligned = len(window) - len(window) % 4
+        stream.write(binascii.a2b_base64(window[:aligned]))
+        leftover = window[aligned:]
+
+    if leftover:
+        # Same as b64decode on a truncated input
+        raise binascii.Error("Incorrect padding")
+
+
+def decode_photo(stream, encoded_str):
+    try:
+        decode_base64_to(stream, encoded_str)
+    except ValueError:
+        raise BadRequest("Invalid photo encoding")
+
+
+def decode_video(stream, encoded_str):
+    try:
+        decode_base64_to(stream, encoded_str)
+    except ValueError:
+        raise BadRequest("Invalid video encoding")
+
+
+class HashingWriter:
+    # Writes go through to stream, the sha256 of everything written is kept on the way
+    def __init__(self, stream):
+        self.stream = stream
+        self.hash = hashlib.sha256()
+
+    def write(self, data):
+        self.hash.update(data)
+        return self.stream.write(data)
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+
+def write_media(stream, media, decode):
+    # Returns the sha256 of the written bytes
+    writer = HashingWriter(stream)
+    if isinstance(media, FileStorage):
+        media.save(writer)
+    else:
+        decode(writer, media)
+    return writer.hexdigest()
+
+
+@contextmanager
+def open_media(media, decode):
+    """
+        A readable stream with the media and its sha256, either the
+        uploaded file part or the base64 string decoded into a spooled
+        file. It's closed, and anything spilled to disk removed, when
+        the block exits
+    """
+    stream = media.stream if isinstance(media, FileStorage) else spooled_file()
+    try:
+        if isinstance(media, FileStorage):
+            # Already spooled by the request, hashed in one more local pass
+            digest = hashlib.file_digest(stream, "sha256").hexdigest()
+        else:
+            digest = write_media(stream, media, decode)
+        stream.seek(0)
+        yield stream, digest
+    finally:
+        stream.close()
+
+
+def request_data():
+    if request.mimetype == "multipart/form-data":
+        # Werkzeug spools big file parts to temporary files while parsing
+        return {**request.form.to_dict(), **request.files.to_dict()}
+    return request.get_json()
+
+
+def schema_columns(model, schema):
+    # Only the columns a response schema reads, the primary key is always kept
+    names = {field.attribute or name for name, field in schema().dump_fields.items()}
+    names.add("pk")
+    return [column for column in model.__table__.columns if column.key in names]
@@ -0,0 +1,90 @@
+import io
+import os
+import threading
+from concurrent.futures import Future
+
+from decouple import config
+from PIL import Image, ImageOps
+
+from utils.pools import worker_pool
+
+"""
+    Smaller copies of the tutorial photos, made on a worker_pool so the
+    resizing doesn't hold the GIL of the request threads. Every variant
+    fits in a square of its size, is never upscaled and is saved as WebP
+"""
+
+# Longest side in pixels
+IMAGE_VARIANTS = {
+    "thumbnail": config("IMAGE_THUMBNAIL_SIZE", default=160, cast=int),
+    "list": config("IMAGE_LIST_SIZE", default=480, cast=int),
+    "detail": config("IMAGE_DETAIL_SIZE", default=1280, cast=int),
+}
+IMAGE_VARIANT_QUALITY = config("IMAGE_VARIANT_QUALITY", default=80, cast=int)
+# Bigger photos are only stored as they are, the pool gets the whole file in memory
+IMAGE_VARIANT_MAX_SIZE = config("IMAGE_VARIANT_MAX_SIZE", default=20 * 1024 * 1024, cast=int)
+IMAGE_WORKERS = config("IMAGE_WORKERS", default=2, cast=int)
+VARIANT_EXTENSION = "webp"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def variant_key(key, name):
+    # media/<sha256>.png -> media/<sha256>.thumbnail.webp
+    return f"{key.rsplit('.', 1)[0]}.{name}.{VARIANT_EXTENSION}"
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        # A forked worker can't use its parent's pool
+        if _pool is None or _pool[0] != os.getpid():
+            _pool = (os.getpid(), worker_pool(IMAGE_WORKERS))
+        return _pool[1]
+
+
+def make_variants(data, sizes=IMAGE_VARIANTS, quality=IMAGE_VARIANT_QUALITY):
+    # Runs in the pool, returns {name: encoded bytes}
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or "A" in image.getbands() else "RGB")
+
+        variants = {}
+        for name, size in sizes.items():
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            variant.save(buffer, "WEBP", quality=quality)
+            variants[name] = buffer.getvalue()
+    return variants
+
+
+def start_variants(stream):
+    """
+        Resizes the photo on the pool, the stream is rewound so it can
+        still be uploaded as it is. A photo over IMAGE_VARIANT_MAX_SIZE
+        isn't read into memory and gets no variants
+    """
+    size = stream.seek(0, os.SEEK_END)
+    stream.seek(0)
+    if size > IMAGE_VARIANT_MAX_SIZE:
+        skipped = Future()
+        skipped.set_result({})
+        return skipped
+
+    data = stream.read()
+    stream.seek(0)
+    return _executor().submit(make_variants, data)
+
+
+def variants_result(future):
+    """
+        The variants, or an empty dict when the photo isn't an image
+        Pillow can read. The original photo is kept either way
+    """
+    try:
+        return future.result()
+    except Exception:
+        return {}
@@ -0,0 +1,14 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+def worker_pool(max_workers):
+    """
+        Processes forked from this one, so CPU bound work doesn't hold
+        the GIL of the request threads. Spawned workers would import
+        app.py and start the server again, so where fork isn't available
+        it's threads, pbkdf2 and Pillow release the GIL for most of their work
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("fork"))
+    return ThreadPoolExecutor(max_workers=max_workers)
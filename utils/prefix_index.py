@@ -0,0 +1,37 @@
+from bisect import bisect_left
+
+
+class PrefixIndex:
+    """
+        Names kept sorted case-insensitively, so all names starting with
+        a prefix are one contiguous range found with bisect. Writers swap
+        in a new list, readers never take a lock
+    """
+
+    def __init__(self, entries=()):
+        self._entries = sorted((name.casefold(), pk, name) for pk, name in entries)
+
+    def add(self, entries):
+        # One new list per batch, sorting two sorted runs is a linear merge
+        added = sorted((name.casefold(), pk, name) for pk, name in entries)
+        self._entries = sorted(self._entries + added)
+
+    def remove(self, pk, name):
+        entry = (name.casefold(), pk, name)
+        position = bisect_left(self._entries, entry)
+        if position < len(self._entries) and self._entries[position] == entry:
+            self._entries = self._entries[:position] + self._entries[position + 1:]
+
+    def search(self, prefix, limit):
+        entries = self._entries
+        key = prefix.casefold()
+        results = []
+        for position in range(bisect_left(entries, (key,)), len(entries)):
+            name_key, pk, name = entries[position]
+            if len(results) == limit or not name_key.startswith(key):
+                break
+            results.append((pk, name))
+        return results
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,63 @@
+import math
+import threading
+import time
+
+from utils.cache import register_cache
+
+
+class RateLimiter:
+    """
+        Token bucket per key, holding at most `capacity` attempts and
+        refilling continuously over `period` seconds. A bucket is stored
+        as a (tokens, updated_at) pair, and full buckets are dropped
+        during compaction since they are the same as a missing one
+    """
+
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period
+        self.retry_after = math.ceil(1 / self.rate)
+        self.rejected = 0
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._compacted_at = time.monotonic()
+        register_cache(self)
+
+    def allow(self, key):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._compacted_at > self.period:
+                self._compact(now)
+
+            tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated_at) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                self.rejected += 1
+                return False
+
+            self._buckets[key] = (tokens - 1, now)
+            return True
+
+    def _compact(self, now):
+        full = [
+            key for key, (tokens, updated_at) in self._buckets.items()
+            if tokens + (now - updated_at) * self.rate >= self.capacity
+        ]
+        for key in full:
+            del self._buckets[key]
+        self._compacted_at = now
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self.rejected = 0
+
+    def stats(self):
+        return {
+            "tracked_keys": len(self._buckets),
+            "capacity": self.capacity,
+            "period": self.period,
+            "rejected": self.rejected,
+        }
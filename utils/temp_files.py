@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from decouple import config
+from flask import Request
+
+from constants import TEMP_FILE_FOLDER
+
+"""
+    Uploads are held in memory up to UPLOAD_SPOOL_SIZE and only bigger
+    ones spill to disk, into a folder of this worker under temp_files.
+    Spilled files are unlinked as soon as they are closed, and the
+    janitor removes whatever a crashed worker or older code left behind
+"""
+
+UPLOAD_SPOOL_SIZE = config("UPLOAD_SPOOL_SIZE", default=8 * 1024 * 1024, cast=int)
+TEMP_FILE_MAX_AGE = config("TEMP_FILE_MAX_AGE", default=3600, cast=int)
+TEMP_FILE_SWEEP_SECONDS = config("TEMP_FILE_SWEEP_SECONDS", default=600, cast=int)
+
+_janitor = None
+_janitor_lock = threading.Lock()
+
+
+def worker_temp_dir():
+    path = os.path.join(TEMP_FILE_FOLDER, f"worker-{os.getpid()}")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def spooled_file():
+    return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE, mode="w+b", dir=worker_temp_dir())
+
+
+class SpooledRequest(Request):
+    # File parts of multipart bodies, by default they spill to the system temp folder
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return spooled_file()
+
+
+def _worker_alive(name):
+    try:
+        pid = int(name.removeprefix("worker-"))
+    except ValueError:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def sweep_temp_files(max_age=TEMP_FILE_MAX_AGE):
+    """
+        Removes files older than max_age and the folders of workers
+        that are gone. Returns how many entries were removed
+    """
+    if not os.path.isdir(TEMP_FILE_FOLDER):
+        return 0
+
+    removed = 0
+    cutoff = time.time() - max_age
+    for entry in os.scandir(TEMP_FILE_FOLDER):
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name.startswith("worker-") and not _worker_alive(entry.name):
+                    shutil.rmtree(entry.path)
+                    removed += 1
+                    continue
+                for child in os.scandir(entry.path):
+                    if child.is_file(follow_symlinks=False) and child.stat().st_mtime < cutoff:
+                        os.remove(child.path)
+                        removed += 1
+            elif entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            # Removed by another worker's janitor in the meantime
+            continue
+    return removed
+
+
+def _sweep_forever(interval):
+    while True:
+        time.sleep(interval)
+        sweep_temp_files()
+
+
+def start_janitor(interval=TEMP_FILE_SWEEP_SECONDS):
+    # Sweeps once at startup, then every interval seconds for the life of the process
+    global _janitor
+    with _janitor_lock:
+        if _janitor is not None and _janitor[0] == os.getpid():
+            return
+        # A folder with this pid can only be left over from an earlier process
+        shutil.rmtree(os.path.join(TEMP_FILE_FOLDER, f"worker-{os.getpid()}"), ignore_errors=True)
+        sweep_temp_files()
+        thread = threading.Thread(target=_sweep_forever, args=(interval,), daemon=True)
+        thread.start()
+        _janitor = (os.getpid(), thread)
@@ -1,10 +1,15 @@
-# import re
+import os
+import re
 
 from marshmallow import ValidationError
 from password_strength import PasswordPolicy
+from werkzeug.datastructures import FileStorage
 
 # EMAIL_REGEX = r"(^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$)"
 
+# Media extensions end up in file names and storage keys
+EXTENSION_PATTERN = r"^[A-Za-z0-9]{1,10}$"
+
 password_requirements = PasswordPolicy.from_names(
     length=8,
     uppercase=1,
@@ -48,3 +53,13 @@ def validate_full_name(value):
             raise ValidationError("First name need to be no more than a 100 characters")
         elif len(last_name) > 100:
             raise ValidationError("Last name need to be no more than a 100 characters")
+
+
+# File parts of multipart requests, the extension is taken from the file name
+def validate_upload(value):
+    if not isinstance(value, FileStorage) or not value.filename:
+        raise ValidationError("Need to upload a file")
+    if "." not in value.filename.strip("."):
+        raise ValidationError("File name needs an extension")
+    if not re.match(EXTENSION_PATTERN, os.path.splitext(value.filename)[1][1:]):
+        raise ValidationError("File extension can only have up to 10 letters and digits")